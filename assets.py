@@ -0,0 +1,284 @@
+#!/bin/env python
+
+import argparse
+import fnmatch
+import glob
+import json
+import os
+import subprocess
+import sys
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from render_cache import file_digest
+
+
+ROOT = Path(__file__).resolve().parent
+STATE_FILE = ROOT / '.asset_cache.json'
+
+# outputs may be glob patterns when their number is not known up front; manual
+# rules need tools or data from outside the repository, and are only built when
+# they are asked for
+Rule = namedtuple(
+    'Rule', ['name', 'sources', 'outputs', 'command', 'cwd', 'manual'], defaults=['.', False]
+)
+
+
+def split_layers(svg: str, nlayers: int) -> Rule:
+    """Inkscape layers of svg, rasterized by svg_splitter.py"""
+    path = Path(svg)
+    outputs = [str(path.parent / f'{path.stem}_Layer_{i + 1}.png') for i in range(nlayers)]
+    outputs.append(str(path.parent / f'{path.stem}.layers.json'))
+    return Rule(
+        name=path.stem,
+        sources=['svg_splitter.py', 'layer_manifest.py', svg],
+        outputs=outputs,
+        command=['svg_splitter.py', svg, '-o', str(path.parent), '-f', 'png'],
+    )
+
+
+def encode_deltas(stem: str, files: list) -> Rule:
+    """Layer deltas of files, in the order in which a slide reveals them"""
+    folder = Path(files[0]).parent
+    return Rule(
+        name=f'{stem}_deltas',
+        sources=['deltas.py', 'layer_manifest.py', *files],
+        outputs=[str(folder / f'{stem}.deltas.json'), str(folder / f'{stem}_delta_*.png')],
+        command=['deltas.py', *files, '-s', stem],
+    )
+
+
+def numbered(pattern: str, numbers) -> list:
+    return [pattern.format(i) for i in numbers]
+
+
+RULES = [
+    split_layers('images/hardware/workflow.svg', 8),
+    split_layers('images/timescales/timescales.svg', 6),
+    split_layers('images/top500.svg', 2),
+    split_layers('images/scatter.svg', 5),
+    split_layers('images/coordination_labeled.svg', 3),
+    Rule(
+        name='reaction_profile',
+        sources=[
+            'images/reaction_profile/plot.py',
+            'images/reaction_profile/FEPs.npz',
+            'images/reaction_profile/fes_rpa.npz',
+            'mpl_splitter.py',
+            'layer_manifest.py',
+        ],
+        # plot.py renders the layers of the surface through mpl_splitter.py
+        outputs=[
+            'images/reaction_profile/reaction_profile.svg',
+            'images/reaction_profile/reaction_surface_*.png',
+            'images/reaction_profile/reaction_surface.layers.json',
+        ],
+        command=['plot.py'],
+        cwd='images/reaction_profile',
+        manual=True,
+    ),
+    Rule(
+        name='reaction_profile_png',
+        sources=['svg_splitter.py', 'images/reaction_profile/reaction_profile.svg'],
+        outputs=['images/reaction_profile/reaction_profile.png'],
+        command=[
+            'svg_splitter.py', 'images/reaction_profile/reaction_profile.svg',
+            '-o', 'images/reaction_profile', '-f', 'png',
+        ],
+    ),
+    # layered figures, in the order in which scene.py reveals their layers
+    encode_deltas('workflow', numbered('images/hardware/workflow_Layer_{}.png', range(1, 9))),
+    encode_deltas('timescales', numbered('images/timescales/timescales_Layer_{}.png', range(2, 6))),
+    encode_deltas('top500', numbered('images/top500_Layer_{}.png', range(1, 3))),
+    encode_deltas('scatter', numbered('images/scatter_Layer_{}.png', range(1, 6))),
+    encode_deltas('coordination_labeled', numbered('images/coordination_labeled_Layer_{}.png', range(1, 4))),
+    encode_deltas('delta_learning', numbered('images/delta_learning_Layer_{}.png', range(1, 5))),
+    encode_deltas('logits', numbered('images/logits_Layer_{}.png', range(1, 5))),
+    encode_deltas('learning', numbered('images/learning_{}.png', range(1, 6))),
+]
+
+
+def expand(patterns) -> list:
+    """Files matching patterns, or None if one of them matches nothing"""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(str(ROOT / pattern)))
+        if not matches:
+            return None
+        paths.extend(matches)
+    return paths
+
+
+def digests(paths) -> dict:
+    return {os.path.relpath(path, ROOT): file_digest(path) for path in paths}
+
+
+def dependencies(rules) -> dict:
+    """Rules which produce (one of) the sources of each rule"""
+    graph = {}
+    for rule in rules:
+        graph[rule.name] = set()
+        for other in rules:
+            if other is rule:
+                continue
+            for source in rule.sources:
+                if any(fnmatch.fnmatch(source, output) for output in other.outputs):
+                    graph[rule.name].add(other.name)
+    return graph
+
+
+class AssetState:
+    """Content hashes of sources and outputs of each rule after its last build"""
+
+    def __init__(self, path=STATE_FILE):
+        self.path = Path(path)
+        try:
+            self.entries = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def current(self, rule: Rule):
+        sources = expand(rule.sources)
+        outputs = expand(rule.outputs)
+        if sources is None:
+            raise FileNotFoundError(f'missing sources for asset rule {rule.name}')
+        return {
+            'sources': digests(sources),
+            'outputs': digests(outputs) if outputs is not None else None,
+        }
+
+    def is_stale(self, rule: Rule) -> bool:
+        current = self.current(rule)
+        return current['outputs'] is None or self.entries.get(rule.name) != current
+
+    def record(self, rule: Rule):
+        self.entries[rule.name] = self.current(rule)
+
+    def adopt(self, rule: Rule) -> bool:
+        """Record outputs that exist without a recorded build, as in a fresh checkout"""
+        if rule.name in self.entries or expand(rule.outputs) is None:
+            return False
+        self.record(rule)
+        return True
+
+    def save(self):
+        self.path.write_text(json.dumps(self.entries, indent=2, sort_keys=True))
+
+
+def run_rule(rule: Rule):
+    command = [sys.executable, *rule.command]
+    # commands run from other folders can still import the modules in here
+    path = os.pathsep.join(filter(None, [str(ROOT), os.environ.get('PYTHONPATH')]))
+    env = dict(os.environ, PYTHONPATH=path)
+    return subprocess.run(command, cwd=ROOT / rule.cwd, capture_output=True, text=True, env=env)
+
+
+def build(rules=RULES, workers: int = None, force: bool = False, touch: bool = False,
+          manual: bool = False):
+    """Rebuild stale assets, running independent rules in parallel
+
+    A rule is stale when one of its sources or outputs changed since it was
+    last built, or when its outputs are missing. Outputs that exist but were
+    never recorded are taken as up to date. Rules only start after the rules
+    that produce their sources have finished. Manual rules are only built
+    with manual set; otherwise their outputs are used as they are. Returns
+    the names of the rules that failed.
+    """
+    state = AssetState()
+    graph = dependencies(rules)
+    rules = {rule.name: rule for rule in rules}
+    done, failed = set(), []
+    running = {}
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while len(done) + len(failed) + len(running) < len(rules) or running:
+                finished = len(done) + len(failed)
+                blocked = {n for n in rules if graph[n] & set(failed)}
+                for name in blocked - set(failed):
+                    print(f"Skipping asset rule {name}: a dependency failed")
+                    failed.append(name)
+                for name, rule in rules.items():
+                    if name in done or name in failed or name in running.values():
+                        continue
+                    if not graph[name] <= done:
+                        continue
+                    try:
+                        if touch:
+                            state.record(rule)
+                            done.add(name)
+                        elif not force and state.adopt(rule):
+                            done.add(name)
+                        elif rule.manual and not manual:
+                            if state.is_stale(rule):
+                                print(f"Warning: asset rule {name} is out of date, "
+                                      f"but is only built when asked for")
+                            done.add(name)
+                        elif force or state.is_stale(rule):
+                            print(f"Building asset rule: {name}")
+                            running[executor.submit(run_rule, rule)] = name
+                        else:
+                            done.add(name)
+                    except FileNotFoundError as e:
+                        print(f"Error: {e}")
+                        failed.append(name)
+                if not running:
+                    if len(done) + len(failed) == finished:
+                        # the remaining rules wait on each other
+                        for name in rules.keys() - done - set(failed):
+                            print(f"Error: asset rule {name} waits on rules that cannot finish")
+                            failed.append(name)
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    result = future.result()
+                    if result.returncode != 0 or expand(rules[name].outputs) is None:
+                        failed.append(name)
+                        print(f"Failed to build asset rule: {name}")
+                        print(result.stdout)
+                        print(result.stderr, file=sys.stderr)
+                    else:
+                        state.record(rules[name])
+                        done.add(name)
+    finally:
+        state.save()
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Rebuild the generated image assets that are out of date.'
+    )
+    parser.add_argument(
+        'rules',
+        nargs='*',
+        help='Names of the rules to consider, which also builds manual ones (default: all)',
+    )
+    parser.add_argument(
+        '-j', '--workers',
+        type=int,
+        default=os.cpu_count(),
+    )
+    parser.add_argument(
+        '-f', '--force',
+        action='store_true',
+        help='Rebuild all rules regardless of their state',
+    )
+    parser.add_argument(
+        '-t', '--touch',
+        action='store_true',
+        help='Mark the current outputs as up to date without building them',
+    )
+    args = parser.parse_args()
+
+    rules = [rule for rule in RULES if not args.rules or rule.name in args.rules]
+    failed = build(rules, args.workers, args.force, args.touch, manual=bool(args.rules))
+    if failed:
+        print(f"Error: {len(failed)} asset rule(s) failed: {' '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,88 @@
+#!/bin/env python
+
+import argparse
+import hashlib
+import json
+import subprocess
+from pathlib import Path
+
+from render_cache import file_digest
+
+
+ROOT = Path(__file__).resolve().parent
+SLIDES_FOLDER = ROOT / 'slides'
+CLIPS_FOLDER = SLIDES_FOLDER / 'clips'
+TRANSCODED_FOLDER = SLIDES_FOLDER / 'files' / 'clips'
+
+
+def record(scene: str, clips: list):
+    """Store which sections of scene are played from a source clip"""
+    CLIPS_FOLDER.mkdir(parents=True, exist_ok=True)
+    (CLIPS_FOLDER / f'{scene}.json').write_text(json.dumps(clips, indent=2))
+
+
+def forget(scene: str):
+    (CLIPS_FOLDER / f'{scene}.json').unlink(missing_ok=True)
+
+
+def transcode(source, speed: float = 1.0, reverse: bool = False) -> Path:
+    """Browser-friendly copy of source, made only once per source content
+
+    At normal speed the video stream is copied as is; slowed down, sped up or
+    reversed clips are re-encoded.
+    """
+    key = json.dumps([file_digest(ROOT / source), speed, reverse])
+    output = TRANSCODED_FOLDER / (hashlib.sha256(key.encode()).hexdigest()[:16] + '.mp4')
+    if output.exists():
+        return output
+    output.parent.mkdir(parents=True, exist_ok=True)
+    filters = []
+    if speed != 1.0:
+        filters.append(f'setpts=PTS/{speed}')
+    if reverse:
+        filters.append('reverse')
+    if filters:
+        codec = ['-vf', ','.join(filters), '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-crf', '18']
+    else:
+        codec = ['-c:v', 'copy']
+    temporary = output.with_suffix('.tmp.mp4')
+    command = ['ffmpeg', '-y', '-loglevel', 'error', '-i', str(ROOT / source), '-an', *codec,
+               '-movflags', '+faststart', str(temporary)]
+    subprocess.run(command, check=True)
+    temporary.replace(output)
+    return output
+
+
+def apply(scenes) -> int:
+    """Point the recorded clip sections of scenes at their source videos
+
+    manim-slides stores one video file per section in slides/<scene>.json; for
+    clip sections, those are replaced by the (transcoded) source, such that
+    both the HTML export and the presenter play the original footage.
+    """
+    count = 0
+    for scene in dict.fromkeys(scenes):
+        path = CLIPS_FOLDER / f'{scene}.json'
+        if not path.exists():
+            continue
+        presentation_path = SLIDES_FOLDER / f'{scene}.json'
+        presentation = json.loads(presentation_path.read_text())
+        for clip in json.loads(path.read_text()):
+            slide = presentation['slides'][clip['section']]
+            forward = transcode(clip['source'], clip['speed'])
+            backward = transcode(clip['source'], clip['speed'], reverse=True)
+            slide['file'] = str(forward.relative_to(ROOT))
+            if 'rev_file' in slide:
+                slide['rev_file'] = str(backward.relative_to(ROOT))
+            count += 1
+        presentation_path.write_text(json.dumps(presentation, indent=2))
+    return count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Replace rendered clip sections by their source videos.'
+    )
+    parser.add_argument('scenes', nargs='+')
+    args = parser.parse_args()
+    print(f"Embedded {apply(args.scenes)} source clip(s)")
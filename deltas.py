@@ -0,0 +1,143 @@
+#!/bin/env python
+
+import argparse
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from layer_manifest import placement, read_entries
+
+
+def composite(below: np.ndarray, layer: np.ndarray, bbox=None) -> np.ndarray:
+    """Straight-alpha RGBA layer drawn over below, only inside bbox"""
+    left, top, right, bottom = bbox or (0, 0, below.shape[1], below.shape[0])
+    result = below.copy()
+    source = layer[top:bottom, left:right].astype(np.float32) / 255
+    target = below[top:bottom, left:right].astype(np.float32) / 255
+    source_alpha, target_alpha = source[..., 3:], target[..., 3:]
+    alpha = source_alpha + target_alpha * (1 - source_alpha)
+    color = source[..., :3] * source_alpha + target[..., :3] * target_alpha * (1 - source_alpha)
+    color /= np.where(alpha > 0, alpha, 1)
+    result[top:bottom, left:right, :3] = np.rint(color * 255)
+    result[top:bottom, left:right, 3:] = np.rint(alpha * 255)
+    return result
+
+
+def composite_at(below: np.ndarray, layer: np.ndarray, offset) -> np.ndarray:
+    """Straight-alpha RGBA layer, cropped out of a page, drawn over below at offset"""
+    x, y = offset
+    layer = layer[:below.shape[0] - y, :below.shape[1] - x]
+    height, width = layer.shape[:2]
+    result = below.copy()
+    result[y:y + height, x:x + width] = composite(below[y:y + height, x:x + width], layer)
+    return result
+
+
+def apply(below: np.ndarray, delta: np.ndarray, offset) -> np.ndarray:
+    """Composite after a layer, from the composite before it and the layer's delta
+
+    Pixels of the delta that are not fully transparent replace those below;
+    the others did not change.
+    """
+    x, y = offset
+    height, width = delta.shape[:2]
+    result = below.copy()
+    region = result[y:y + height, x:x + width]
+    changed = delta[..., 3] > 0
+    region[changed] = delta[changed]
+    return result
+
+
+def load_layer(path, entries: dict) -> np.ndarray:
+    """RGBA pixels of a layer on its full page, also when the file is cropped"""
+    with Image.open(path) as image:
+        pixels = np.asarray(image.convert('RGBA'))
+    height, width = pixels.shape[:2]
+    (page_width, page_height), (x, y) = placement(entries.get(Path(path).resolve()), (width, height))
+    if (page_width, page_height) == (width, height):
+        return pixels
+    canvas = np.zeros((page_height, page_width, 4), dtype=np.uint8)
+    canvas[y:y + height, x:x + width] = pixels[:page_height - y, :page_width - x]
+    return canvas
+
+
+def manifest_path(output_dir, stem) -> Path:
+    return Path(output_dir) / f'{stem}.deltas.json'
+
+
+def encode(paths, output_dir, stem: str) -> list:
+    """Store each layer as the pixels it changes in the composite of the layers before
+
+    Layers are composited in the given order, which must be the order in
+    which a slide reveals them. For each layer, the changed pixels of the
+    composite are cropped to their bounding box and written as
+    <stem>_delta_<n>.png; everything else in the crop is transparent. The
+    offsets of the crops are listed in <stem>.deltas.json.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    entries = []
+    below = None
+    previous = None
+    placements = {}
+    for index, path in enumerate(paths):
+        path = Path(path)
+        folder = path.resolve().parent
+        if folder not in placements:
+            placements[folder] = read_entries(folder)
+        layer = load_layer(path, placements[folder])
+        if below is None:
+            below = np.zeros_like(layer)
+        elif layer.shape != below.shape:
+            raise ValueError(f'{path} differs in size from the layers before it')
+        after = composite(below, layer)
+        changed = np.any(after != below, axis=-1)
+        entry = {
+            'source': os.path.relpath(path, output_dir),
+            'previous': previous,
+            'size': [layer.shape[1], layer.shape[0]],
+            'file': None,
+            'offset': None,
+        }
+        if changed.any():
+            rows = np.flatnonzero(changed.any(axis=1))
+            columns = np.flatnonzero(changed.any(axis=0))
+            top, bottom = rows[0], rows[-1] + 1
+            left, right = columns[0], columns[-1] + 1
+            delta = np.where(changed[..., None], after, 0)[top:bottom, left:right]
+            output = output_dir / f'{stem}_delta_{index + 1}.png'
+            Image.fromarray(delta.astype(np.uint8), 'RGBA').save(output)
+            entry['file'] = output.name
+            entry['offset'] = [int(left), int(top)]
+        entries.append(entry)
+        below = after
+        previous = entry['source']
+    manifest_path(output_dir, stem).write_text(json.dumps({'layers': entries}, indent=2))
+    return entries
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Store layer images as the pixels each one adds to the ones before it.'
+    )
+    parser.add_argument(
+        'paths',
+        nargs='+',
+        help='Layer images, in the order in which they are revealed',
+    )
+    parser.add_argument(
+        '-o', '--output-dir',
+        default=None,
+        help='Output directory (default: that of the first layer)',
+    )
+    parser.add_argument(
+        '-s', '--stem',
+        required=True,
+        help='Name of the figure, used for the delta images and the manifest',
+    )
+    args = parser.parse_args()
+    entries = encode(args.paths, args.output_dir or Path(args.paths[0]).parent, args.stem)
+    print(f"Encoded {sum(e['file'] is not None for e in entries)} layer deltas of {args.stem}")
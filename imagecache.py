@@ -0,0 +1,168 @@
+import json
+import os
+from collections import OrderedDict
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+from PIL import Image
+
+import manim
+from manim.constants import DEFAULT_QUALITY, QUALITIES
+
+import mipmaps
+
+
+# decoded pixels kept per process; IMAGE_CACHE_BYTES overrides the budget
+BUDGET = int(os.environ.get('IMAGE_CACHE_BYTES', 1 << 30))
+# written by the render driver, lists images it decoded into shared memory
+SHARED_INDEX = os.environ.get('IMAGE_CACHE_INDEX')
+# manim's default for scale_to_resolution: images keep their size at any quality
+RESOLUTION = QUALITIES[DEFAULT_QUALITY]['pixel_height']
+
+
+def decode(path, mode: str = 'RGBA') -> np.ndarray:
+    with Image.open(path) as image:
+        return np.asarray(image.convert(mode))
+
+
+def attach(name: str):
+    """Attach to an existing shared memory segment without owning it"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # python < 3.13 always registers the segment
+        segment = shared_memory.SharedMemory(name=name)
+        # otherwise the segment is unlinked when this worker exits
+        resource_tracker.unregister(segment._name, 'shared_memory')
+        return segment
+
+
+class ImageCache:
+    """LRU of decoded, read-only pixel arrays keyed by path and mtime
+
+    Arrays which the render driver already decoded into shared memory are
+    mapped instead of decoded; those do not count towards the budget.
+    """
+
+    def __init__(self, budget: int = BUDGET, index: str = SHARED_INDEX):
+        self.budget = budget
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.segments = {}
+        self.shared = {}
+        if index:
+            try:
+                with open(index) as f:
+                    self.shared = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+    def key(self, path, mode):
+        path = os.path.abspath(path)
+        return path, os.stat(path).st_mtime_ns, mode
+
+    def from_shared(self, key):
+        path, mtime, mode = key
+        entry = self.shared.get(path)
+        if entry is None or entry['mtime_ns'] != mtime or entry['mode'] != mode:
+            return None
+        if entry['name'] not in self.segments:
+            try:
+                self.segments[entry['name']] = attach(entry['name'])
+            except FileNotFoundError:
+                return None
+        buffer = self.segments[entry['name']].buf
+        array = np.ndarray(tuple(entry['shape']), dtype=np.uint8, buffer=buffer)
+        array.setflags(write=False)
+        return array
+
+    def get(self, path, mode: str = 'RGBA') -> np.ndarray:
+        key = self.key(path, mode)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        array = self.from_shared(key)
+        if array is not None:
+            return array
+        array = decode(path, mode)
+        array.setflags(write=False)
+        if array.nbytes <= self.budget:
+            self.entries[key] = array
+            self.nbytes += array.nbytes
+            while self.nbytes > self.budget:
+                _, evicted = self.entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+        return array
+
+
+cache = ImageCache()
+
+
+class ImageMobject(manim.ImageMobject):
+    """Drop-in ImageMobject which takes decoded pixels from the shared cache
+
+    Files are loaded from their pre-scaled mipmap for the render resolution
+    when there is one, with scale_to_resolution adjusted so the image keeps
+    its size. The height at which each file is displayed is recorded for
+    mipmaps.py.
+    """
+
+    def __init__(
+        self,
+        filename_or_array,
+        scale_to_resolution: int = RESOLUTION,
+        **kwargs,
+    ):
+        self.source = None
+        if isinstance(filename_or_array, (str, os.PathLike)):
+            self.source = str(filename_or_array)
+            mode = kwargs.get('image_mode', 'RGBA')
+            path = mipmaps.variant(self.source, manim.config.pixel_height)
+            if path is not None:
+                with Image.open(self.source) as image:
+                    rows = image.height
+                filename_or_array = cache.get(path, mode)
+                scale_to_resolution *= filename_or_array.shape[0] / rows
+            else:
+                filename_or_array = cache.get(self.source, mode)
+        super().__init__(filename_or_array, scale_to_resolution=scale_to_resolution, **kwargs)
+
+    def get_pixel_array(self):
+        # called by the camera for every frame in which the image is visible
+        if self.source is not None:
+            mipmaps.observe(self.source, self.height / manim.config.frame_height)
+        return super().get_pixel_array()
+
+
+def share(paths, index: str, budget: int = BUDGET, mode: str = 'RGBA') -> list:
+    """Decode images into shared memory for the render workers
+
+    Writes the index that workers find through IMAGE_CACHE_INDEX and returns
+    the segments, which the caller unlinks once all workers are done.
+    """
+    segments, entries, total = [], {}, 0
+    for path in dict.fromkeys(os.path.abspath(p) for p in paths):
+        try:
+            array = decode(path, mode)
+        except OSError:
+            continue
+        if total + array.nbytes > budget:
+            continue
+        segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=np.uint8, buffer=segment.buf)[...] = array
+        segments.append(segment)
+        entries[path] = {
+            'name': segment.name,
+            'shape': list(array.shape),
+            'mtime_ns': os.stat(path).st_mtime_ns,
+            'mode': mode,
+        }
+        total += array.nbytes
+    with open(index, 'w') as f:
+        json.dump(entries, f)
+    return segments
+
+
+def unshare(segments):
+    for segment in segments:
+        segment.close()
+        segment.unlink()
@@ -10,6 +10,7 @@ from mpl_toolkits.axes_grid1 import make_axes_locatable
 import colorcet as cc
 import pandas as pd
 
+from mpl_splitter import export_layers
 from utils import create_label, read_orca
 
 
@@ -80,22 +81,22 @@ if __name__ == '__main__':
     )
     line_start = (5.7, 0.03)
     line_end = (7.3, 0.9)
-    ax.plot([line_start[0], line_end[0]], [line_start[1], line_end[1]], 'k-',linewidth=0.5)
+    line, = ax.plot([line_start[0], line_end[0]], [line_start[1], line_end[1]], 'k-',linewidth=0.5)
 
     def add_rotated_text(ax, text, pos, angle, offset):
         display_pos = ax.transData.transform(pos)
         offset_display = ax.transAxes.transform((offset, 0)) - ax.transAxes.transform((0, 0))
         display_pos = display_pos + offset_display
         data_pos = ax.transData.inverted().transform(display_pos)
-        ax.text(data_pos[0], data_pos[1], text, rotation=angle + 20,
-                rotation_mode='anchor', ha='center', va='center')
+        return ax.text(data_pos[0], data_pos[1], text, rotation=angle + 20,
+                       rotation_mode='anchor', ha='center', va='center')
 
     dx = line_end[0] - line_start[0]
     dy = line_end[1] - line_start[1]
     angle = np.degrees(np.arctan2(dy, dx))
     midpoint = ((line_start[0] + line_end[0]) / 2, (line_start[1] + line_end[1]) / 2)
 
-    add_rotated_text(ax, 'combined CV', midpoint, angle, -0.05)
+    line_label = add_rotated_text(ax, 'combined CV', midpoint, angle, -0.05)
 
     # mid_point = ((line_start[0] + line_end[0]) / 2, (line_start[1] + line_end[1]) / 2)
     # angle = np.degrees(np.arctan2(line_end[1] - line_start[1], line_end[0] - line_start[0]))
@@ -117,4 +118,12 @@ if __name__ == '__main__':
     cbar.ax.set_xticks([0, 40, 80, 120])
     cbar.ax.xaxis.set_ticks_position('top')
 
-    figure.savefig('reaction_surface.svg', bbox_inches='tight', transparent=True, format='svg')
+    # axes first, then the surface with its colorbar, then the path across it
+    export_layers(
+        figure,
+        {
+            'surface': [contour, contour_lines, cbar.ax],
+            'path': [line, line_label],
+        },
+        Path('reaction_surface'),
+    )
@@ -0,0 +1,190 @@
+#!/bin/env python
+
+import argparse
+import ast
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent
+
+# (arg_separator, tex_environment) defaults of the manim classes
+TEX_CLASSES = {
+    'Tex': ('', 'center'),
+    'MathTex': (' ', 'align*'),
+}
+
+
+class UnknownValue(Exception):
+    pass
+
+
+def evaluate(node, env: dict):
+    """Evaluate the simple string expressions used to build Tex arguments"""
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name) and node.id in env:
+        return env[node.id]
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        return evaluate(node.left, env) + evaluate(node.right, env)
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'str' \
+            and len(node.args) == 1:
+        return str(evaluate(node.args[0], env))
+    raise UnknownValue
+
+
+def tex_calls(node, env: dict, found: list):
+    for child in ast.walk(node):
+        if isinstance(child, ast.Call) and isinstance(child.func, ast.Name) \
+                and child.func.id in TEX_CLASSES:
+            try:
+                args = [evaluate(arg, env) for arg in child.args]
+                kwargs = {
+                    k.arg: evaluate(k.value, env)
+                    for k in child.keywords
+                    if k.arg in ('arg_separator', 'tex_environment')
+                }
+                for k in child.keywords:
+                    # templates are looked up by the name they are assigned to
+                    if k.arg == 'tex_template':
+                        if not isinstance(k.value, ast.Name):
+                            raise UnknownValue
+                        kwargs[k.arg] = k.value.id
+            except UnknownValue:
+                continue
+            found.append((child.func.id, tuple(args), kwargs))
+
+
+def visit(statements, env: dict, found: list):
+    """Walk statements in order, tracking string variables and Tex calls"""
+    for statement in statements:
+        if isinstance(statement, (ast.FunctionDef, ast.ClassDef)):
+            visit(statement.body, dict(env), found)
+            continue
+        if isinstance(statement, (ast.For, ast.While, ast.If, ast.With, ast.Try)):
+            for field in ('body', 'orelse', 'finalbody'):
+                visit(getattr(statement, field, []), env, found)
+            for handler in getattr(statement, 'handlers', []):
+                visit(handler.body, env, found)
+            continue
+        tex_calls(statement, env, found)
+        if isinstance(statement, ast.Assign):
+            for target in statement.targets:
+                if isinstance(target, ast.Name):
+                    try:
+                        env[target.id] = evaluate(statement.value, env)
+                    except UnknownValue:
+                        env.pop(target.id, None)
+        elif isinstance(statement, ast.AugAssign) and isinstance(statement.target, ast.Name):
+            name = statement.target.id
+            try:
+                env[name] = evaluate(ast.BinOp(ast.Name(name), statement.op, statement.value), env)
+            except (UnknownValue, TypeError):
+                env.pop(name, None)
+
+
+def collect(paths=('scene.py',)):
+    """All Tex/MathTex calls whose arguments can be determined statically
+
+    Returns (class name, tex strings, keyword arguments) tuples, in which the
+    tex_template keyword refers to the name of a module-level TexTemplate.
+    Expressions that depend on loop variables are left to the render itself.
+    """
+    found = []
+    for path in paths:
+        visit(ast.parse((ROOT / path).read_text()).body, {}, found)
+    return found
+
+
+def templates(path='scene.py') -> dict:
+    """Module-level TexTemplate instances, by name"""
+    from manim import TexTemplate
+    tree = ast.parse((ROOT / path).read_text())
+    result = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Call) \
+                and isinstance(node.value.func, ast.Name) and node.value.func.id == 'TexTemplate':
+            kwargs = {k.arg: ast.literal_eval(k.value) for k in node.value.keywords}
+            for target in node.targets:
+                result[target.id] = TexTemplate(**kwargs)
+    return result
+
+
+def modified_expression(tex_string: str) -> str:
+    """The expression manim writes to the .tex file for tex_string"""
+    from manim.mobject.text.tex_mobject import SingleStringMathTex
+    try:
+        mobject = SingleStringMathTex.__new__(SingleStringMathTex)
+        return mobject._get_modified_expression(tex_string)
+    except Exception:
+        return tex_string.strip()
+
+
+def compile_expression(expression: str, environment: str, tex_template):
+    """Compile one expression into manim's tex directory, unless it is there"""
+    from manim.utils.tex_file_writing import compile_tex, convert_to_svg, generate_tex_file
+    tex_file = generate_tex_file(expression, environment, tex_template)
+    if tex_file.with_suffix('.svg').exists():
+        return False
+    dvi_file = compile_tex(tex_file, tex_template.tex_compiler, tex_template.output_format)
+    convert_to_svg(dvi_file, tex_template.output_format)
+    return True
+
+
+def precompile(paths=('scene.py',), workers: int = None) -> int:
+    """Compile every distinct Tex/MathTex expression of the deck concurrently
+
+    Manim compiles each expression with its own latex and dvisvgm run the
+    first time it is constructed, one after the other. Filling the tex
+    directory up front turns those into cache hits during the render.
+    """
+    from manim import config
+    from manim.utils.tex_file_writing import delete_nonsvg_files
+    named = {}
+    for path in paths:
+        named.update(templates(path))
+
+    jobs = {}
+    for name, args, kwargs in collect(paths):
+        separator, environment = TEX_CLASSES[name]
+        separator = kwargs.get('arg_separator', separator)
+        environment = kwargs.get('tex_environment', environment)
+        template = named.get(kwargs.get('tex_template'), config['tex_template'])
+        tex_string = separator.join(a for a in args if a)
+        if not tex_string.strip():
+            continue
+        expression = modified_expression(tex_string)
+        jobs[(expression, environment, id(template))] = (expression, environment, template)
+
+    def run(job):
+        try:
+            return compile_expression(*job)
+        except Exception as e:  # reported again, in context, by the render itself
+            print(f"Could not compile {job[0]!r}: {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        compiled = sum(executor.map(run, jobs.values()))
+    if not config['no_latex_cleanup']:
+        delete_nonsvg_files()
+    print(f"Compiled {compiled} of {len(jobs)} distinct LaTeX expressions")
+    return compiled
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Compile all LaTeX in the deck into the manim tex cache.'
+    )
+    parser.add_argument(
+        'paths',
+        nargs='*',
+        default=['scene.py'],
+    )
+    parser.add_argument(
+        '-j', '--workers',
+        type=int,
+        default=os.cpu_count(),
+    )
+    args = parser.parse_args()
+    precompile(args.paths, args.workers)
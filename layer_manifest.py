@@ -0,0 +1,58 @@
+import hashlib
+import json
+from pathlib import Path
+
+
+def manifest_path(output_dir, stem) -> Path:
+    return Path(output_dir) / f'{stem}.layers.json'
+
+
+def layer_entry(path, offset=(0, 0), page=None) -> dict:
+    """Manifest entry of a rasterized layer: placement, bounding box and content hash
+
+    A layer image may be cropped out of its page; offset is then the position
+    of its top left corner on the page, and page the size of the page, in
+    pixels. The bounding box is (left, top, right, bottom) in page pixels,
+    covering all pixels that are not fully transparent, or None for an empty
+    layer.
+    """
+    from PIL import Image
+    data = Path(path).read_bytes()
+    with Image.open(path) as image:
+        bbox = image.getchannel('A').getbbox() if 'A' in image.getbands() else image.getbbox()
+        size = image.size
+    if bbox:
+        bbox = [bbox[0] + offset[0], bbox[1] + offset[1], bbox[2] + offset[0], bbox[3] + offset[1]]
+    return {
+        'file': Path(path).name,
+        'size': list(size),
+        'offset': list(offset),
+        'page': list(page or size),
+        'bbox': bbox or None,
+        'hash': hashlib.sha256(data).hexdigest(),
+    }
+
+
+def write_manifest(path, source, layers):
+    """Write the layers of a figure, bottom to top, next to their files"""
+    manifest = {'source': Path(source).name, 'layers': layers}
+    Path(path).write_text(json.dumps(manifest, indent=2))
+
+
+def read_entries(folder) -> dict:
+    """Entries of all layer manifests in folder, by resolved layer file"""
+    entries = {}
+    for path in sorted(Path(folder).glob('*.layers.json')):
+        try:
+            layers = json.loads(path.read_text())['layers']
+        except (OSError, ValueError, KeyError):
+            continue
+        entries.update({(path.parent / layer['file']).resolve(): layer for layer in layers})
+    return entries
+
+
+def placement(entry, size) -> tuple:
+    """(page size, offset) of a layer image of the given size"""
+    if entry is None or 'page' not in entry:
+        return tuple(size), (0, 0)
+    return tuple(entry['page']), tuple(entry['offset'])
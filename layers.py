@@ -0,0 +1,154 @@
+import json
+import math
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from manim import config
+
+import mipmaps
+from deltas import apply as apply_delta, composite, composite_at
+from imagecache import RESOLUTION, ImageMobject, cache
+from layer_manifest import placement, read_entries
+
+
+@lru_cache(maxsize=None)
+def manifest_entries(folder: str) -> dict:
+    return read_entries(folder)
+
+
+def layer_info(path) -> tuple:
+    """Page size, bounding box on the page, offset and size of a layer file
+
+    Layers which the splitters cropped to their content are placed on the
+    page through their manifest; files without one cover the whole page.
+    """
+    path = Path(path)
+    entry = manifest_entries(str(path.parent)).get(path.resolve())
+    if entry is not None:
+        bbox = entry['bbox']
+        page, offset = placement(entry, entry['size'])
+        return page, tuple(bbox) if bbox else None, offset, tuple(entry['size'])
+    with Image.open(path) as image:
+        return image.size, (0, 0) + image.size, (0, 0), image.size
+
+
+@lru_cache(maxsize=None)
+def delta_entries(folder: str) -> dict:
+    """Layer deltas written by deltas.py in folder, by (layer, previous layer)"""
+    entries = {}
+    for path in sorted(Path(folder).glob('*.deltas.json')):
+        try:
+            layers = json.loads(path.read_text())['layers']
+        except (OSError, ValueError, KeyError):
+            continue
+        for layer in layers:
+            previous = layer['previous'] and (path.parent / layer['previous']).resolve()
+            key = (path.parent / layer['source']).resolve(), previous
+            file = layer['file'] and path.parent / layer['file']
+            entries[key] = dict(layer, file=file)
+    return entries
+
+
+def find_deltas(paths, size):
+    """(delta file, offset) for each layer in order, or None if one is missing or stale"""
+    deltas = []
+    previous = None
+    for path in paths:
+        path = Path(path).resolve()
+        entry = delta_entries(str(path.parent)).get((path, previous))
+        if entry is None or tuple(entry['size']) != size:
+            return None
+        if entry['file'] is not None:
+            try:
+                if entry['file'].stat().st_mtime_ns < path.stat().st_mtime_ns:
+                    return None
+            except FileNotFoundError:
+                return None
+        deltas.append((entry['file'], entry['offset']))
+        previous = path
+    return deltas
+
+
+class LayeredFigure(ImageMobject):
+    """Stack of same-size layer images which are revealed one at a time
+
+    Layers are only loaded when they are revealed, and are flattened into a
+    single composite right away, such that each frame draws one image no
+    matter how many layers are shown. The bounding boxes in the splitters'
+    manifests limit compositing to the part of the canvas a layer covers.
+    Layers cropped by the splitters are blended into their part of the page.
+    When deltas.py encoded the layers in this order, only the cropped pixels
+    each layer changes are loaded and copied in.
+    """
+
+    def __init__(self, paths, **kwargs):
+        self.paths = [str(path) for path in paths]
+        if not self.paths:
+            raise ValueError('a layered figure needs at least one layer')
+        self.infos = [layer_info(path) for path in self.paths]
+        (width, height), _, _, _ = self.infos[0]
+        if any(page != (width, height) for page, _, _, _ in self.infos):
+            raise ValueError(f'layers of {self.paths[0]} differ in size')
+        self.revealed = 0
+
+        # deltas of the layers in this order are cheapest to reveal; otherwise
+        # pre-scaled layers are used when every layer has one
+        self.deltas = find_deltas(self.paths, (width, height))
+        variants = [mipmaps.variant(path, config.pixel_height) for path in self.paths]
+        if self.deltas is None and all(variants):
+            with Image.open(variants[0]) as image:
+                self.ratio = image.height / self.infos[0][3][1]
+            self.files = [str(variant) for variant in variants]
+        else:
+            self.ratio = 1.0
+            self.files = self.paths
+        shape = (round(height * self.ratio), round(width * self.ratio), 4)
+        kwargs['scale_to_resolution'] = kwargs.get('scale_to_resolution', RESOLUTION) * self.ratio
+        super().__init__(np.zeros(shape, dtype=np.uint8), **kwargs)
+
+    def offset(self, index):
+        _, _, (x, y), _ = self.infos[index]
+        return round(x * self.ratio), round(y * self.ratio)
+
+    def bbox(self, index):
+        _, bbox, _, _ = self.infos[index]
+        if bbox is None:
+            return None
+        left, top, right, bottom = bbox
+        return (
+            math.floor(left * self.ratio),
+            math.floor(top * self.ratio),
+            math.ceil(right * self.ratio),
+            math.ceil(bottom * self.ratio),
+        )
+
+    def reveal(self, count: int = 1):
+        """Draw the next count layers on top of those shown so far"""
+        mode = self.image_mode
+        pixels = self.pixel_array
+        for index in range(self.revealed, min(self.revealed + count, len(self.paths))):
+            bbox = self.bbox(index)
+            if self.deltas is not None:
+                file, offset = self.deltas[index]
+                if file is not None:
+                    pixels = apply_delta(pixels, cache.get(file, mode), offset)
+            elif bbox is not None:
+                layer = cache.get(self.files[index], mode)
+                if layer.shape[:2] == pixels.shape[:2]:
+                    pixels = composite(pixels, layer, bbox)
+                else:
+                    # cropped layer: blend it into its part of the page
+                    pixels = composite_at(pixels, layer, self.offset(index))
+            self.revealed = index + 1
+        self.pixel_array = pixels
+        return self
+
+    def get_pixel_array(self):
+        if self.deltas is None:
+            for path, ((_, page), _, _, (_, size)) in zip(self.paths, self.infos[:self.revealed]):
+                # cropped layer files take up part of the figure's height
+                mipmaps.observe(path, self.height * size / page / config.frame_height)
+        return super().get_pixel_array()
@@ -0,0 +1,88 @@
+from collections import namedtuple
+
+
+# overlay colours of the slide numbers, as understood by manim
+DARK_OVERLAY = '#FFFFFF'
+LIGHT_OVERLAY = '#000000'
+
+Entry = namedtuple('Entry', ['name', 'number', 'light'])
+
+DECK = []
+
+
+def register(name: str, numbered: bool = True, light: bool = False):
+    """Append a slide to the deck
+
+    Slide numbers follow from the order of registration. A slide which is
+    registered again keeps the number of its first appearance, such that it
+    only needs to be rendered once.
+    """
+    previous = [entry for entry in DECK if entry.name == name]
+    if previous:
+        entry = previous[0]
+    else:
+        numbers = [entry.number for entry in DECK if entry.number is not None]
+        number = max(numbers, default=0) + 1 if numbered else None
+        entry = Entry(name, number, light)
+    DECK.append(entry)
+    return entry
+
+
+def slides() -> list:
+    """Slide names in presentation order, including repeated slides"""
+    return [entry.name for entry in DECK]
+
+
+def unique_slides() -> list:
+    """Slide names which need to be rendered, in order of first appearance"""
+    return list(dict.fromkeys(slides()))
+
+
+def overlay(name: str):
+    """Slide number and its colour for slide `name`"""
+    for entry in DECK:
+        if entry.name == name:
+            return entry.number, LIGHT_OVERLAY if entry.light else DARK_OVERLAY
+    raise KeyError(f'slide {name} is not part of the deck')
+
+
+register('Title', numbered=False)
+register('Particles')
+register('PeriodicTable')
+register('Masses')
+register('Dynamics')
+register('OverviewPhysics')
+register('TimeEvolution')
+register('TimeScales')
+register('Overview')
+register('HydrogenRevisited')
+register('Priors')
+register('Dimensionality')
+register('Images')
+register('Network')
+register('GNN')
+register('OverviewGNN')
+register('Three')
+register('Systems', light=True)
+register('QM', light=True)
+register('HPC', light=True)
+register('LUMI', numbered=False)
+register('OnlineLearning', light=True)
+register('Hardware', light=True)
+register('Psiflow', light=True)
+register('ThreeReview')
+register('Movie', light=True)
+register('Features', light=True)
+register('DeltaLearning')
+register('DeltaLearningFigure', light=True)
+register('IsobuteneProfile', light=True)
+register('ThreeFinal')
+register('IsobuteneBasins', light=True)
+register('ManualLikelihood', light=True)
+register('PhaseLearningFigure', light=True)
+register('LearnedLikelihood', light=True)
+register('MIL53', light=True)
+register('Learning', light=True)
+register('Performance', light=True)
+register('ThreeFinal')
+register('Acknowledgements', light=True)
@@ -0,0 +1,149 @@
+#!/bin/env python
+
+import argparse
+import atexit
+import json
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent
+MIPMAP_FOLDER = ROOT / 'media' / 'mipmaps'
+# largest on-screen height of each image, as a fraction of the frame height
+SIZES_FILE = MIPMAP_FOLDER / 'sizes.json'
+# render processes each report what they displayed in here
+REPORTS_FOLDER = MIPMAP_FOLDER / 'reports'
+TIERS = (720, 1080, 2160)
+
+observed = {}
+
+
+def relative(path) -> str:
+    return os.path.relpath(os.path.abspath(path), ROOT)
+
+
+def tier(pixel_height: int):
+    """Smallest mipmap tier that covers a render of pixel_height, if any"""
+    return next((t for t in TIERS if t >= pixel_height), None)
+
+
+def variant_path(path, tier: int) -> Path:
+    return MIPMAP_FOLDER / f'{tier}p' / relative(path)
+
+
+def variant(path, pixel_height: int):
+    """Up to date, pre-scaled copy of path for a render of pixel_height, or None"""
+    t = tier(pixel_height)
+    if t is None:
+        return None
+    candidate = variant_path(path, t)
+    try:
+        if candidate.stat().st_mtime_ns >= os.stat(path).st_mtime_ns:
+            return candidate
+    except FileNotFoundError:
+        pass
+    return None
+
+
+def observe(path, fraction: float):
+    """Remember that path was displayed at fraction of the frame height"""
+    key = relative(path)
+    if fraction > observed.get(key, 0.0):
+        if not observed:
+            atexit.register(report)
+        observed[key] = fraction
+
+
+def report():
+    REPORTS_FOLDER.mkdir(parents=True, exist_ok=True)
+    (REPORTS_FOLDER / f'{os.getpid()}.json').write_text(json.dumps(observed))
+
+
+def load_sizes() -> dict:
+    """Recorded sizes, merged with the reports of renders since the last build"""
+    try:
+        sizes = json.loads(SIZES_FILE.read_text())
+    except (OSError, ValueError):
+        sizes = {}
+    reports = sorted(REPORTS_FOLDER.glob('*.json')) if REPORTS_FOLDER.exists() else []
+    for path in reports:
+        try:
+            for key, fraction in json.loads(path.read_text()).items():
+                sizes[key] = max(fraction, sizes.get(key, 0.0))
+        except ValueError:
+            pass
+    if reports:
+        SIZES_FILE.write_text(json.dumps(sizes, indent=2, sort_keys=True))
+        for path in reports:
+            path.unlink()
+    return sizes
+
+
+def build_variant(source: Path, fraction: float, tier: int) -> bool:
+    """Resample source to the height it takes up in a render at tier
+
+    Images are only ever shrunk; when the source is not larger than needed, a
+    stale variant is removed so the source itself is loaded.
+    """
+    from PIL import Image
+    output = variant_path(source, tier)
+    with Image.open(source) as image:
+        height = math.ceil(fraction * tier)
+        if height >= image.height:
+            output.unlink(missing_ok=True)
+            return False
+        if output.exists() and output.stat().st_mtime_ns >= source.stat().st_mtime_ns:
+            with Image.open(output) as existing:
+                if existing.height == height:
+                    return False
+        width = max(1, round(image.width * height / image.height))
+        output.parent.mkdir(parents=True, exist_ok=True)
+        resized = image.resize((width, height), Image.LANCZOS)
+        temporary = output.with_name(output.stem + '.tmp' + output.suffix)
+        resized.save(temporary, format=image.format)
+        temporary.replace(output)
+    return True
+
+
+def build(workers: int = None, tiers=TIERS) -> int:
+    """Generate the mipmaps of every image that a render has displayed"""
+    jobs = []
+    for key, fraction in load_sizes().items():
+        source = ROOT / key
+        if source.is_file():
+            jobs.extend((source, fraction, t) for t in tiers)
+
+    def run(job):
+        try:
+            return build_variant(*job)
+        except OSError as e:
+            print(f"Could not resample {job[0]}: {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        built = sum(executor.map(run, jobs))
+    print(f"Generated {built} image mipmap(s)")
+    return built
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Pre-scale images to the size at which the slides show them.'
+    )
+    parser.add_argument(
+        '-j', '--workers',
+        type=int,
+        default=os.cpu_count(),
+    )
+    parser.add_argument(
+        '--tiers',
+        type=int,
+        nargs='+',
+        choices=TIERS,
+        default=list(TIERS),
+        help='Render heights to generate variants for (default: 720 1080 2160)',
+    )
+    args = parser.parse_args()
+    build(args.workers, args.tiers)
@@ -1,15 +1,27 @@
 #!/bin/env python
 
 import argparse
-import copy
+import fnmatch
+import os
 import xml.etree.ElementTree as ET
 import re
-import cairosvg
 import io
+import numpy as np
 from PIL import Image
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Optional
 
+import deltas
+from layer_manifest import layer_entry, manifest_path, write_manifest
+from split_batch import Splitter, split_all, watch
+
+
+# files that hold matplotlib figures
+FIGURES = rb'id=["\']figure_\d+["\']'
+# top-level elements that every layer keeps
+SHARED = ('defs', 'metadata', 'style')
+
 
 def ensure_visibility(element):
     style = element.get('style', '')
@@ -48,72 +60,459 @@ def output_template(path_svg: Path, index: int, format: str) -> str:
     return path_svg.parent / (path_svg.stem + f'_{index}.{format}')
 
 
-def split_svg_layers(path_svg: Path, dpi: int, separate: Optional[str] = None):
+def key_white(pixels: np.ndarray, tolerance: int = 0, soft: bool = False) -> np.ndarray:
+    """Make the white background of RGBA pixels transparent
+
+    pixels may hold any number of images, stacked along the leading axes.
+    Pixels within tolerance of white in every channel become transparent. With
+    soft, the anti-aliased edges get partial alpha instead: their colour is
+    un-premultiplied against white, so they blend onto any background the
+    way they blended onto white.
+    """
+    rgb = pixels[..., :3].astype(np.float32)
+    distance = (255.0 - rgb).max(axis=-1)
+    result = pixels.copy()
+    if soft:
+        alpha = np.clip((distance - tolerance) / max(255.0 - tolerance, 1.0), 0.0, 1.0)
+        visible = alpha > 0
+        safe = np.where(visible, alpha, 1.0)[..., None]
+        color = 255.0 - (255.0 - rgb) / safe
+        result[..., :3] = np.where(visible[..., None], np.clip(np.rint(color), 0, 255), 255)
+        result[..., 3] = np.rint(alpha * pixels[..., 3]).astype(np.uint8)
+    else:
+        white = distance <= tolerance
+        result[white] = (255, 255, 255, 0)
+    return result
+
+
+def strip_background(figure_group):
+    """Remove the background patches of the figure and of each of its axes
+
+    matplotlib draws them first in their group, as patch_* elements. Without
+    them cairosvg renders onto a transparent background, so white content
+    such as contour lines or marker fills stays white.
+    """
+    groups = [figure_group] + [
+        elem for elem in figure_group.iter() if elem.get('id', '').startswith('axes_')
+    ]
+    for group in groups:
+        children = list(group)
+        if children and children[0].get('id', '').startswith('patch_'):
+            group.remove(children[0])
+
+
+def rasterize(
+    documents: list,
+    png_output_paths: list,
+    dpi: int,
+    base_url: str,
+    key: bool = False,
+    tolerance: int = 0,
+    soft: bool = False,
+):
+    """Render a batch of SVG documents to PNGs, optionally keying out white
+
+    Returns the manifest entries of the PNGs.
+    """
+    import cairosvg
+    if not key:
+        for document, path in zip(documents, png_output_paths):
+            cairosvg.svg2png(bytestring=document, url=base_url, dpi=dpi, write_to=str(path))
+        return [layer_entry(path) for path in png_output_paths]
+    images = [
+        np.asarray(Image.open(io.BytesIO(
+            cairosvg.svg2png(bytestring=document, url=base_url, dpi=dpi)
+        )).convert("RGBA"))
+        for document in documents
+    ]
+    # layers of one figure share their size, so they are keyed as one array
+    if len({image.shape for image in images}) == 1:
+        images = key_white(np.stack(images), tolerance, soft)
+    else:
+        images = [key_white(image, tolerance, soft) for image in images]
+    for image, path in zip(images, png_output_paths):
+        Image.fromarray(image, "RGBA").save(path, "PNG")
+    return [layer_entry(path) for path in png_output_paths]
+
+
+def parse_selection(expression: Optional[str]) -> list:
+    """Layers to split off, as lists of id patterns
+
+    Layers are separated by commas and the patterns within one layer by plus
+    signs, so 'data_1,data_2+data_3' makes one layer of data_1 and one of
+    data_2 and data_3 together. Patterns are shell-style wildcards. By
+    default, every data_* element gets a layer of its own.
+    """
+    if not expression:
+        return None
+    return [
+        [pattern.strip() for pattern in group.split('+') if pattern.strip()]
+        for group in expression.split(',')
+        if group.strip()
+    ]
+
+
+def candidates(root) -> list:
+    """(parent, element) for the axes of every figure and their artists"""
+    found = []
+    for figure in root.iter():
+        if not re.fullmatch(r'figure_\d+', figure.get('id', '')):
+            continue
+        for axes in list(figure):
+            if not axes.get('id', '').startswith('axes_'):
+                continue
+            found.append((figure, axes))
+            found.extend((axes, child) for child in axes)
+    return found
+
+
+def layer_documents(path_svg: Path, selection: Optional[list]):
+    """Labels and SVG documents of the background and the selected layers
+
+    Returns None when the file has no figure group.
+    """
     tree = ET.parse(str(path_svg))
     root = tree.getroot()
 
     # Store original SVG attributes
     original_attrs = root.attrib.copy()
 
-    # Find the main figure group
-    figure_group = root.find(".//*[@id='figure_1']")
-    if figure_group is None:
-        print("Could not find the main figure group.")
-        return
-
-    # Find the axes group
-    axes_group = figure_group.find(".//*[@id='axes_1']")
-    if axes_group is None:
-        print("Could not find the axes group.")
-        return
+    # Find the figure groups
+    figures = [elem for elem in root.iter() if re.fullmatch(r'figure_\d+', elem.get('id', ''))]
+    if not figures:
+        return None
+    for figure_group in figures:
+        strip_background(figure_group)
 
-    # Create background layer (everything except data layers)
-    background_layer = copy.deepcopy(figure_group)
-    bg_axes_group = background_layer.find(".//*[@id='axes_1']")
+    elements = candidates(root)
+    if selection is None:
+        selection = [
+            [element.get('id')] for _, element in elements
+            if element.get('id', '').startswith('data_')
+        ]
 
-    # Identify and extract data layers
+    # Detach the selected elements; what remains is the background
     data_layers = []
-    for child in list(axes_group):
-        if child.get('id', '').startswith('data_'):
-            data_layer = ET.Element('g')
-            data_layer.append(copy.deepcopy(child))
-            data_layers.append(data_layer)
-            bg_axes_group.remove(bg_axes_group.find(f".//*[@id='{child.get('id')}']"))
+    labels = ['background'] + ['+'.join(patterns) for patterns in selection]
+    taken = set()
+    for patterns in selection:
+        data_layer = ET.Element('g')
+        for parent, element in elements:
+            if id(element) in taken:
+                continue
+            if any(fnmatch.fnmatchcase(element.get('id', ''), p) for p in patterns):
+                parent.remove(element)
+                data_layer.append(element)
+                taken.add(id(element))
+        if len(data_layer) == 0:
+            print(f"Warning: nothing matches {'+'.join(patterns)}")
+        data_layers.append(data_layer)
 
     # Prepare all layers
+    shared = [child for child in root if child.tag.split('}')[-1] in SHARED]
+    background_layer = ET.Element('g')
+    background_layer.extend(child for child in root if child not in shared)
     all_layers = [background_layer] + data_layers
 
-    for index, layer in enumerate(all_layers):
-        # Create new SVG with original attributes
+    documents = []
+    for layer in all_layers:
+        # Create new SVG with original attributes, and the shared defs
         new_svg = ET.Element('svg', original_attrs)
+        new_svg.extend(shared)
         new_svg.append(layer)
 
         # Ensure visibility of all elements
         for elem in new_svg.iter():
             ensure_visibility(elem)
 
-        # Create SVG file
-        new_tree = ET.ElementTree(new_svg)
-        svg_output_path = output_template(path_svg, index=index + 1, format='svg')
-        new_tree.write(str(svg_output_path), encoding='utf-8', xml_declaration=True)
-
-        # Convert SVG to PNG
-        png_output_path = output_template(path_svg, index=index + 1, format='png')
-        cairosvg.svg2png(url=str(svg_output_path), write_to=str(png_output_path), dpi=dpi)
-
-        # Process PNG to make white background transparent
-        img = Image.open(png_output_path)
-        img = img.convert("RGBA")
-        datas = img.getdata()
-        new_data = []
-        for item in datas:
-            if item[0] == 255 and item[1] == 255 and item[2] == 255:
-                new_data.append((255, 255, 255, 0))
+        documents.append(ET.tostring(new_svg, encoding='utf-8', xml_declaration=True))
+    return labels, documents
+
+
+def stream_layer_documents(path_svg: Path, selection: Optional[list]):
+    """Like layer_documents, but streams the file with lxml
+
+    Each artist that is split off is serialized into its layer as soon as it
+    has been parsed, and removed from the tree. Top-level elements go into
+    the background, or into every layer for defs, metadata and style, once
+    parsed, and are dropped as well. So at most one copy of the document is
+    held in memory, however many artists the figure has.
+    """
+    from lxml import etree
+    from svg_splitter import root_tags
+
+    figure_id = re.compile(r'figure_\d+')
+    labels, chunks = ['background'], [[]]
+    if selection is not None:
+        labels += ['+'.join(patterns) for patterns in selection]
+        chunks += [[] for _ in selection]
+    shared = []
+    root = None
+    figures = 0
+    open_figures = 0
+    # open elements, and how many children of each have been parsed
+    stack, counts = [], []
+    for event, elem in etree.iterparse(str(path_svg), events=('start', 'end'), huge_tree=True):
+        elem_id = elem.get('id', '')
+        if event == 'start':
+            root = elem if root is None else root
+            if figure_id.fullmatch(elem_id):
+                figures += 1
+                open_figures += 1
+            stack.append(elem)
+            counts.append(0)
+            continue
+        stack.pop()
+        counts.pop()
+        if figure_id.fullmatch(elem_id):
+            open_figures -= 1
+        if not stack:
+            continue
+        parent = stack[-1]
+        parent_id = parent.get('id', '')
+        first = counts[-1] == 0
+        counts[-1] += 1
+        in_figure = bool(figure_id.fullmatch(parent_id))
+        in_axes = parent_id.startswith('axes_') and len(stack) > 1 \
+            and bool(figure_id.fullmatch(stack[-2].get('id', '')))
+
+        # the background patches of figures and axes (see strip_background)
+        if first and elem_id.startswith('patch_') \
+                and (in_figure or (parent_id.startswith('axes_') and open_figures)):
+            parent.remove(elem)
+            continue
+
+        # axes and artists that are split off (see candidates)
+        if in_axes or (in_figure and elem_id.startswith('axes_')):
+            if selection is None:
+                index = None
+                if elem_id.startswith('data_'):
+                    labels.append(elem_id)
+                    chunks.append([])
+                    index = len(chunks) - 1
             else:
-                new_data.append(item)
-        img.putdata(new_data)
-        img.save(png_output_path, "PNG")
-    print(f"Split and converted {len(all_layers)} layers from {path_svg}")
+                index = next((
+                    number + 1 for number, patterns in enumerate(selection)
+                    if any(fnmatch.fnmatchcase(elem_id, p) for p in patterns)
+                ), None)
+            if index is not None:
+                for child in elem.iter(etree.Element):
+                    ensure_visibility(child)
+                chunks[index].append(etree.tostring(elem, with_tail=False))
+                parent.remove(elem)
+                continue
+
+        if len(stack) == 1:
+            for child in elem.iter(etree.Element):
+                ensure_visibility(child)
+            local = etree.QName(elem).localname if isinstance(elem.tag, str) else None
+            (shared if local in SHARED else chunks[0]).append(etree.tostring(elem, with_tail=False))
+            root.remove(elem)
+
+    if not figures:
+        return None
+    if selection is not None:
+        for patterns, layer in zip(selection, chunks[1:]):
+            if not layer:
+                print(f"Warning: nothing matches {'+'.join(patterns)}")
+    ensure_visibility(root)
+    opening, closing = root_tags(root)
+    header = b"<?xml version='1.0' encoding='utf-8'?>\n" + opening + b''.join(shared)
+    # each layer's chunks are released as soon as its document is assembled
+    documents = []
+    while chunks:
+        layer = chunks.pop(0)
+        documents.append(header + b'<g style="display:inline">' + b''.join(layer) + b'</g>' + closing)
+    return labels, documents
+
+
+def split_svg_layers(
+    path_svg: Path,
+    dpi: int,
+    separate: Optional[str] = None,
+    workers: Optional[int] = None,
+    key: bool = False,
+    tolerance: int = 0,
+    soft: bool = False,
+    delta: bool = False,
+    backend: str = 'etree',
+):
+    """Rasterize a matplotlib SVG into a background and separate artist layers
+
+    Every figure and axes group in the file is considered. The background,
+    layer 1, holds everything that is not split off; the other layers follow
+    in the order of the selection (see parse_selection). With delta, layers
+    are also stored as the pixels they add to the layers before them. The
+    lxml backend streams the file instead of loading it whole. Returns the
+    files written.
+    """
+    selection = parse_selection(separate)
+    if backend == 'lxml':
+        layers = stream_layer_documents(path_svg, selection)
+    else:
+        layers = layer_documents(path_svg, selection)
+    if layers is None:
+        print("Could not find a figure group.")
+        return []
+    labels, documents = layers
+
+    # Rasterize all layers in parallel, straight from memory, one batch of
+    # layers per worker
+    base_url = str(path_svg.resolve())
+    paths = [
+        output_template(path_svg, index=index + 1, format='png')
+        for index in range(len(documents))
+    ]
+    workers = min(workers or os.cpu_count(), len(documents))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                rasterize,
+                documents[start::workers],
+                paths[start::workers],
+                dpi,
+                base_url,
+                key,
+                tolerance,
+                soft,
+            )
+            for start in range(workers)
+        ]
+        entries = [None] * len(documents)
+        for start, future in enumerate(futures):
+            entries[start::workers] = future.result()
+    write_manifest(
+        manifest_path(path_svg.parent, path_svg.stem),
+        path_svg,
+        [dict(label=label, **entry) for label, entry in zip(labels, entries)],
+    )
+    if delta:
+        deltas.encode(paths, path_svg.parent, path_svg.stem)
+    print(f"Split and converted {len(documents)} layers from {path_svg}")
+    return paths + [manifest_path(path_svg.parent, path_svg.stem)]
+
+
+def artist_tree(figure) -> tuple:
+    """Every artist of a figure, parents before their children, and the index of each parent"""
+    artists, parents = [], []
+    seen = set()
+    stack = [(figure, None)]
+    while stack:
+        artist, parent = stack.pop()
+        if id(artist) in seen:
+            continue
+        seen.add(id(artist))
+        artists.append(artist)
+        parents.append(parent)
+        index = len(artists) - 1
+        stack.extend((child, index) for child in reversed(artist.get_children()))
+    return artists, parents
+
+
+def layer_visibility(parents: list, groups: list) -> list:
+    """Visibility of every artist in the background and in each group of artist indices
+
+    An artist belongs to the first group that lists it, or else to the group
+    of its parent; the background holds the artists of no group. A layer also shows the
+    parents of its artists, such as their axes, but not their other children.
+    """
+    owner = [None] * len(parents)
+    for number, group in enumerate(groups):
+        for index in group:
+            if owner[index] is None:
+                owner[index] = number
+    for index, parent in enumerate(parents):
+        if owner[index] is None and parent is not None:
+            owner[index] = owner[parent]
+    visibility = [[number is None for number in owner]]
+    for number, group in enumerate(groups):
+        visible = [owner_number == number for owner_number in owner]
+        for index in group:
+            parent = parents[index]
+            while parent is not None and not visible[parent]:
+                visible[parent] = True
+                parent = parents[parent]
+        visibility.append(visible)
+    return visibility
+
+
+def render_layers(figure_data: bytes, visibility: list, png_output_paths: list, dpi: int, bbox):
+    """Render a batch of layers of a pickled figure to transparent PNGs with Agg
+
+    Returns the manifest entries of the PNGs.
+    """
+    import pickle
+    figure = pickle.loads(figure_data)
+    artists, _ = artist_tree(figure)
+    for visible, path in zip(visibility, png_output_paths):
+        for artist, shown in zip(artists, visible):
+            artist.set_visible(shown)
+        figure.savefig(path, dpi=dpi, format="png", transparent=True, bbox_inches=bbox)
+    return [layer_entry(path) for path in png_output_paths]
+
+
+def export_layers(
+    figure,
+    groups: dict,
+    path: Path,
+    dpi: int = 300,
+    workers: Optional[int] = None,
+    delta: bool = False,
+    pad_inches: float = 0.1,
+):
+    """Render the artists of a live matplotlib figure straight to PNG layers
+
+    groups maps the label of each layer to an artist or a list of artists,
+    which come with everything they contain; the background, layer 1, holds
+    all other artists. The layers are written like split_svg_layers would
+    for the figure saved as path, without the round trip through SVG: all
+    share the tight bounding box of the whole figure, and the backgrounds of
+    the figure and its axes are transparent. Each worker process renders
+    its batch of layers on its own copy of the figure. Returns the files
+    written.
+    """
+    import pickle
+    path = Path(path)
+    artists, parents = artist_tree(figure)
+    indices = {id(artist): index for index, artist in enumerate(artists)}
+    members = []
+    for label, group in groups.items():
+        group = list(group) if isinstance(group, (list, tuple, set)) else [group]
+        missing = [artist for artist in group if id(artist) not in indices]
+        if missing:
+            raise ValueError(f"{missing[0]} in layer {label} is not part of the figure")
+        members.append([indices[id(artist)] for artist in group])
+    visibility = layer_visibility(parents, members)
+    labels = ["background"] + list(groups)
+
+    bbox = figure.get_tightbbox().padded(pad_inches)
+    figure_data = pickle.dumps(figure)
+    paths = [output_template(path, index=index + 1, format="png") for index in range(len(labels))]
+    workers = min(workers or os.cpu_count(), len(labels))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                render_layers,
+                figure_data,
+                visibility[start::workers],
+                paths[start::workers],
+                dpi,
+                bbox,
+            )
+            for start in range(workers)
+        ]
+        entries = [None] * len(labels)
+        for start, future in enumerate(futures):
+            entries[start::workers] = future.result()
+    write_manifest(
+        manifest_path(path.parent, path.stem),
+        path,
+        [dict(label=label, **entry) for label, entry in zip(labels, entries)],
+    )
+    if delta:
+        deltas.encode(paths, path.parent, path.stem)
+    print(f"Rendered {len(labels)} layers of {path}")
+    return paths + [manifest_path(path.parent, path.stem)]
 
 
 if __name__ == '__main__':
@@ -122,6 +521,7 @@ if __name__ == '__main__':
         "--svg",
         type=str,
         default=None,
+        help="matplotlib SVG to split, or a directory of them",
     )
     parser.add_argument(
         "--dpi",
@@ -132,12 +532,78 @@ if __name__ == '__main__':
         "--separate",
         type=str,
         default=None,
+        help="Layers to split off, e.g. 'data_1,data_2+data_3' (default: every data_* id)",
+    )
+    parser.add_argument(
+        "--key-white",
+        action="store_true",
+        help="Also make white pixels transparent, for figures with an opaque background",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=int,
+        default=0,
+        help="With --key-white, also key out pixels this close (0-255) to white",
+    )
+    parser.add_argument(
+        "--soft-alpha",
+        action="store_true",
+        help="With --key-white, give anti-aliased edges partial alpha",
+    )
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help="Also store each layer as the pixels it adds to the layers before it",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["etree", "lxml"],
+        default="etree",
+        help="XML parser; lxml streams very large files",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="In a directory, also split files that did not change since their last split",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running, and split files again whenever they are saved",
     )
     args = parser.parse_args()
     assert args.svg is not None
 
-    split_svg_layers(
-        Path(args.svg),
-        dpi=args.dpi,
-        separate=args.separate,
-    )
+    def split(path, workers):
+        return split_svg_layers(
+            Path(path),
+            dpi=args.dpi,
+            separate=args.separate,
+            workers=workers,
+            key=args.key_white,
+            tolerance=args.tolerance,
+            soft=args.soft_alpha,
+            delta=args.delta,
+            backend=args.backend,
+        )
+
+    if os.path.isdir(args.svg) or args.watch:
+        # every matplotlib SVG in the directory that changed since its last split
+        options = [
+            args.dpi, args.separate, args.key_white, args.tolerance, args.soft_alpha, args.delta,
+            args.backend,
+        ]
+        splitter = Splitter(
+            "mpl_splitter", ["mpl_splitter.py", "layer_manifest.py", "deltas.py"], FIGURES, split, options
+        )
+        failed = split_all([args.svg], splitter, args.workers, args.force)
+        if args.watch:
+            watch([args.svg], splitter, args.workers)
+        exit(1 if failed else 0)
+    split(args.svg, args.workers)
@@ -1,45 +1,332 @@
+import argparse
 import cv2
+import json
+import math
+import numpy as np
 import os
+import queue
+import struct
+import threading
 
-def extract_frames(video_path, output_folder):
+
+FORMATS = ('jpg', 'png', 'webp', 'frames')
+
+# frame tensor files: a fixed-size header followed by (N, H, W, 3) RGB uint8
+TENSOR_MAGIC = b'FRAMES01'
+TENSOR_HEADER = '<8sdQQQQ'  # magic, fps, N, H, W, channels
+TENSOR_HEADER_SIZE = 64
+
+
+def write_tensor_header(path, fps, shape):
+    header = struct.pack(TENSOR_HEADER, TENSOR_MAGIC, fps, *shape)
+    with open(path, 'r+b') as f:
+        f.write(header.ljust(TENSOR_HEADER_SIZE, b'\0'))
+
+
+def write_holds(path, fps, holds):
+    """Store for how many source frames each extracted frame stays on screen"""
+    with open(path, 'w') as f:
+        json.dump({'fps': fps, 'holds': holds}, f)
+
+
+def read_holds(path):
+    """Holds written next to extracted frames, or None if there are none"""
+    try:
+        with open(path) as f:
+            return json.load(f)['holds']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def signature(frame, size=32):
+    """Small grayscale thumbnail which is compared to detect near-duplicates"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+def open_tensor(path):
+    """Read-only (N, H, W, 3) view of a frame tensor file, and its frame rate
+
+    Frames are sliced straight from the memory map; nothing is decoded or
+    copied until a frame is actually used.
+    """
+    with open(path, 'rb') as f:
+        header = f.read(TENSOR_HEADER_SIZE)
+    magic, fps, *shape = struct.unpack_from(TENSOR_HEADER, header)
+    if magic != TENSOR_MAGIC:
+        raise ValueError(f"{path} is not a frame tensor file")
+    frames = np.memmap(path, dtype=np.uint8, mode='r', offset=TENSOR_HEADER_SIZE, shape=tuple(shape))
+    return frames, fps
+
+
+class TensorSink:
+    """Writes frames into a memory-mapped frame tensor file"""
+
+    def __init__(self, path, capacity, size, fps):
+        self.path = path
+        self.fps = fps
+        self.shape = (capacity, size[1], size[0], 3)
+        with open(path, 'wb') as f:
+            f.truncate(TENSOR_HEADER_SIZE + int(np.prod(self.shape)))
+        write_tensor_header(path, fps, self.shape)
+        self.frames = np.memmap(path, dtype=np.uint8, mode='r+', offset=TENSOR_HEADER_SIZE, shape=self.shape)
+
+    def __call__(self, index, frame):
+        self.frames[index] = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    def close(self, count, holds):
+        """Shrink the tensor to the number of frames actually written"""
+        self.frames.flush()
+        del self.frames
+        shape = (count,) + self.shape[1:]
+        with open(self.path, 'r+b') as f:
+            f.truncate(TENSOR_HEADER_SIZE + int(np.prod(shape)))
+        write_tensor_header(self.path, self.fps, shape)
+        write_holds(self.path + '.json', self.fps, holds)
+
+
+class ImageSink:
+    """Writes frames as separate image files"""
+
+    def __init__(self, output_folder, format, quality, fps):
+        self.output_folder = output_folder
+        self.format = format
+        self.fps = fps
+        self.parameters = encode_parameters(format, quality)
+
+    def __call__(self, index, frame):
+        frame_path = os.path.join(self.output_folder, f"frame_{index:04d}.{self.format}")
+        if not cv2.imwrite(frame_path, frame, self.parameters):
+            raise IOError(f"could not write {frame_path}")
+
+    def close(self, count, holds):
+        write_holds(os.path.join(self.output_folder, 'frames.json'), self.fps, holds)
+
+
+def target_size(frame_width, frame_height, width=None, height=None):
+    """Output size, keeping the aspect ratio if only one dimension is given"""
+    if width is None and height is None:
+        return None
+    if width is None:
+        width = round(frame_width * height / frame_height)
+    if height is None:
+        height = round(frame_height * width / frame_width)
+    return int(width), int(height)
+
+
+def encode_parameters(format, quality):
+    if format == 'jpg':
+        return [cv2.IMWRITE_JPEG_QUALITY, quality]
+    elif format == 'webp':
+        return [cv2.IMWRITE_WEBP_QUALITY, quality]
+    else:
+        # PNG is lossless; favour speed over file size
+        return [cv2.IMWRITE_PNG_COMPRESSION, 1]
+
+
+def write_frames(frames, size, sink, errors):
+    """Resize frames from the queue and hand them to sink, until a None arrives"""
+    while True:
+        item = frames.get()
+        if item is None:
+            break
+        index, frame = item
+        try:
+            if size is not None:
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            sink(index, frame)
+        except Exception as e:
+            errors.append(e)
+
+
+def extract_frames(
+    video_path,
+    output_folder,
+    width=None,
+    height=None,
+    stride=1,
+    format='jpg',
+    quality=95,
+    workers=None,
+    threshold=None,
+):
+    """Extract the frames of a video, optionally dropping near-duplicates
+
+    With a threshold, a frame whose thumbnail differs on average less than
+    threshold (in 0-255 grey levels) from the last kept frame is dropped, and
+    the kept frame is held on screen for longer instead. Hold durations, in
+    source frames, are written next to the output so playback timing is kept.
+    """
     # Create output folder if it doesn't exist
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
-    
+
     # Open the video file
     video = cv2.VideoCapture(video_path)
-    
+
     # Check if video opened successfully
     if not video.isOpened():
         print("Error: Could not open video file")
         return
-    
+
+    frame_width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
+    frame_height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    size = target_size(frame_width, frame_height, width, height)
+    fps = video.get(cv2.CAP_PROP_FPS) / stride
+    if format == 'frames':
+        # all frames go into one memory-mapped file, sized after the frame
+        # count the container reports
+        capacity = math.ceil(int(video.get(cv2.CAP_PROP_FRAME_COUNT)) / stride)
+        tensor_path = os.path.join(
+            output_folder,
+            os.path.splitext(os.path.basename(video_path))[0] + '.frames',
+        )
+        sink = TensorSink(
+            tensor_path,
+            capacity,
+            size or (frame_width, frame_height),
+            fps,
+        )
+    else:
+        capacity = None
+        sink = ImageSink(output_folder, format, quality, fps)
+
+    # Decoding happens on this thread; resizing, encoding and writing in a
+    # pool of workers (OpenCV releases the GIL for those). The queue is bounded
+    # so decoding never runs far ahead of the writers.
+    workers = workers or os.cpu_count()
+    frames = queue.Queue(maxsize=4 * workers)
+    errors = []
+    threads = [
+        threading.Thread(target=write_frames, args=(frames, size, sink, errors))
+        for _ in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+
     # Get frame count for naming
     frame_count = 0
-    
-    while True:
-        # Read next frame
-        success, frame = video.read()
-        
-        # Break if no frame was read
-        if not success:
-            break
-        
-        # Save frame as image
-        frame_path = os.path.join(output_folder, f"frame_{frame_count:04d}.jpg")
-        cv2.imwrite(frame_path, frame)
-        
-        frame_count += 1
-        
-        # Optional: Print progress
-        if frame_count % 100 == 0:
-            print(f"Extracted {frame_count} frames")
-    
-    # Release video capture object
-    video.release()
-    print(f"Finished extracting {frame_count} frames")
-
-# Example usage
-video_path = "images/movie/movie.mp4"
-output_folder = "images/movie"
-extract_frames(video_path, output_folder)
+    index = 0
+    holds = []
+    last = None
+
+    try:
+        while not errors:
+            # Skipped frames are only grabbed, not decoded into an image
+            if index % stride != 0:
+                if not video.grab():
+                    break
+                index += 1
+                continue
+
+            # Read next frame
+            success, frame = video.read()
+            index += 1
+
+            # Break if no frame was read
+            if not success:
+                break
+            # Drop frames that are nearly identical to the last kept one
+            if threshold is not None:
+                current = signature(frame)
+                if last is not None and np.mean(np.abs(current - last)) < threshold:
+                    holds[-1] += 1
+                    continue
+                last = current
+
+            if frame_count == capacity:
+                print(f"Warning: stopping at the {capacity} frames reported by the video")
+                break
+
+            # Queue frame for writing
+            frames.put((frame_count, frame))
+            holds.append(1)
+
+            frame_count += 1
+
+            # Optional: Print progress
+            if frame_count % 100 == 0:
+                print(f"Extracted {frame_count} frames")
+    finally:
+        for _ in threads:
+            frames.put(None)
+        for thread in threads:
+            thread.join()
+        sink.close(frame_count, holds)
+
+        # Release video capture object
+        video.release()
+
+    if errors:
+        raise errors[0]
+    print(f"Finished extracting {frame_count} frames ({sum(holds)} before de-duplication)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Extract all frames of a video as separate images.'
+    )
+    parser.add_argument(
+        'video_path',
+        nargs='?',
+        default='images/movie/movie.mp4',
+    )
+    parser.add_argument(
+        '-o', '--output-folder',
+        default='images/movie',
+    )
+    parser.add_argument(
+        '--width',
+        type=int,
+        default=None,
+        help='Width of the extracted frames (default: source width)',
+    )
+    parser.add_argument(
+        '--height',
+        type=int,
+        default=None,
+        help='Height of the extracted frames (default: source height)',
+    )
+    parser.add_argument(
+        '--stride',
+        type=int,
+        default=1,
+        help='Keep only every n-th frame (default: 1)',
+    )
+    parser.add_argument(
+        '-f', '--format',
+        choices=FORMATS,
+        default='jpg',
+        help='Image format, or "frames" for a single memory-mapped frame tensor',
+    )
+    parser.add_argument(
+        '--quality',
+        type=int,
+        default=95,
+        help='JPEG/WebP quality (default: 95)',
+    )
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=None,
+        help='Drop frames differing less than this (0-255) from the previous one',
+    )
+    parser.add_argument(
+        '-j', '--workers',
+        type=int,
+        default=os.cpu_count(),
+        help='Number of threads that encode and write frames',
+    )
+    args = parser.parse_args()
+
+    extract_frames(
+        args.video_path,
+        args.output_folder,
+        width=args.width,
+        height=args.height,
+        stride=args.stride,
+        format=args.format,
+        quality=args.quality,
+        workers=args.workers,
+        threshold=args.threshold,
+    )
@@ -2,7 +2,9 @@ from functools import partial
 
 import numpy as np
 
-from manim import Circle, Square, WHITE, Text, VGroup, DOWN, BLACK, ManimColor
+from manim import Circle, Square, WHITE, VGroup, DOWN, BLACK, ManimColor
+
+from textcache import Text
 
 
 NUCLEUS_COLOR = ManimColor.from_rgb((237, 105, 52))
@@ -1,6 +1,7 @@
-from manim import Square, Text, WHITE, VGroup, BLACK
+from manim import Square, WHITE, VGroup, BLACK
 
 from particles import ELECTRON_COLOR
+from textcache import Text
 
 
 elements = {
@@ -0,0 +1,233 @@
+#!/bin/env python
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from assets import build as build_assets
+from clips import apply as apply_clips
+from latex import precompile
+from mipmaps import build as build_mipmaps, variant as mipmap_variant
+from manifest import overlay, slides as deck, unique_slides
+from render_cache import RenderCache, SceneSources, render_config, slide_digest
+
+
+ROOT = Path(__file__).resolve().parent
+
+
+IMAGE_SUFFIXES = ('.png', '.jpg', '.jpeg')
+
+
+def render_environment(**extra):
+    """Environment for the manim subprocesses, with the repo on PYTHONPATH"""
+    env = os.environ.copy()
+    env['PYTHONPATH'] = os.pathsep.join(
+        [str(ROOT)] + [p for p in env.get('PYTHONPATH', '').split(os.pathsep) if p]
+    )
+    env.update(extra)
+    return env
+
+
+def slide_images(sources, name: str, pixel_height: int) -> set:
+    """Raster images which slide `name` loads, or their mipmaps if there are any"""
+    paths = (
+        ROOT / label.split(':', 1)[1]
+        for label in sources.dependencies(name)
+        if label.startswith('asset:') and label.lower().endswith(IMAGE_SUFFIXES)
+    )
+    return {str(mipmap_variant(path, pixel_height) or path) for path in paths}
+
+
+def render_slide(
+    name: str,
+    fps: int = 60,
+    resolution: tuple = (1920, 1080),
+    image_index: str = None,
+):
+    """Render a single Slide subclass from scene.py in its own manim process"""
+    command = [
+        'manim', 'render',
+        '--fps', str(fps),
+        '-r', f'{resolution[0]},{resolution[1]}',
+        '--progress_bar', 'none',
+        'scene.py', name,
+    ]
+    start = time.perf_counter()
+    result = subprocess.run(
+        command,
+        cwd=ROOT,
+        env=render_environment(**({'IMAGE_CACHE_INDEX': image_index} if image_index else {})),
+        capture_output=True,
+        text=True,
+    )
+    return result, time.perf_counter() - start
+
+
+def render(
+    slides,
+    workers: int,
+    fps: int = 60,
+    resolution: tuple = (1920, 1080),
+    force: bool = False,
+):
+    """Render slides concurrently; returns the names of slides that failed
+
+    Every slide is rendered by a separate manim process, so the pool below only
+    limits how many of those processes run at the same time. Slides whose
+    sources, helper modules, assets and render config are unchanged since their
+    last successful render are skipped, unless force is set.
+
+    Images used by more than one of the slides to render are decoded once,
+    into shared memory which all manim processes map read-only.
+    """
+    # a slide which appears more than once in the deck only needs one render
+    slides = list(dict.fromkeys(slides))
+    cache = RenderCache()
+    sources = SceneSources()
+    config = render_config(
+        fps=fps,
+        resolution=list(resolution),
+        still_frames=os.environ.get('STILL_FRAMES', '1') != '0',
+        clip_passthrough=os.environ.get('CLIP_PASSTHROUGH', '1') != '0',
+    )
+    # the slide number is baked into the frames, so it is part of the hash;
+    # moving a slide only invalidates it when its number actually changes
+    digests = {
+        name: slide_digest(
+            sources,
+            name,
+            dict(config, overlay=overlay(name) if name in deck() else None),
+        )
+        for name in slides
+    }
+
+    todo = []
+    for name in slides:
+        if not force and cache.is_fresh(name, digests[name]):
+            print(f"Skipping unchanged slide: {name}")
+        else:
+            cache.invalidate(name)
+            todo.append(name)
+
+    from imagecache import share as share_images, unshare as unshare_images
+    failed = []
+    segments = []
+    index = tempfile.NamedTemporaryFile(prefix='image_cache_', suffix='.json', delete=False)
+    index.close()
+    try:
+        if len(todo) > 1:
+            images = [slide_images(sources, name, resolution[1]) for name in todo]
+            shared = {path for path in set().union(*images) if sum(path in i for i in images) > 1}
+            segments = share_images(sorted(shared), index.name)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(render_slide, name, fps, resolution, index.name if segments else None): name
+                for name in todo
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                result, elapsed = future.result()
+                if result.returncode != 0:
+                    failed.append(name)
+                    print(f"Failed to render slide: {name}")
+                    print(result.stdout)
+                    print(result.stderr, file=sys.stderr)
+                else:
+                    cache.update(name, digests[name])
+                    print(f"Rendered slide: {name} ({elapsed:.1f}s)")
+    finally:
+        cache.save()
+        unshare_images(segments)
+        os.unlink(index.name)
+    return failed
+
+
+def convert(slides, output: str = 'scene.html'):
+    """Convert the rendered slides, in deck order, to a single HTML file"""
+    command = ['manim-slides', 'convert', '--to=HTML', *slides, output]
+    subprocess.run(command, cwd=ROOT, env=render_environment(), check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Render all slides in parallel and convert them to HTML.'
+    )
+    parser.add_argument(
+        'slides',
+        nargs='*',
+        help='Slides to render (default: the full deck in manifest.py)',
+    )
+    parser.add_argument(
+        '-j', '--workers',
+        type=int,
+        default=os.cpu_count(),
+        help='Number of slides rendered at the same time (default: all cores)',
+    )
+    parser.add_argument(
+        '--fps',
+        type=int,
+        default=60,
+    )
+    parser.add_argument(
+        '-r', '--resolution',
+        type=str,
+        default='1920,1080',
+        help='Render resolution as "width,height" (default: 1920,1080)',
+    )
+    parser.add_argument(
+        '-o', '--output',
+        default='scene.html',
+        help='Output HTML file (default: scene.html)',
+    )
+    parser.add_argument(
+        '-f', '--force',
+        action='store_true',
+        help='Render all slides, even those whose cached output is up to date',
+    )
+    parser.add_argument(
+        '--no-assets',
+        action='store_true',
+        help='Do not rebuild stale image assets and mipmaps before rendering',
+    )
+    parser.add_argument(
+        '--no-latex',
+        action='store_true',
+        help='Do not precompile the LaTeX of all slides before rendering',
+    )
+    parser.add_argument(
+        '--no-convert',
+        action='store_true',
+        help='Only render, do not run manim-slides convert',
+    )
+    args = parser.parse_args()
+
+    resolution = tuple(int(n) for n in args.resolution.split(','))
+
+    if not args.no_assets:
+        failed = build_assets(workers=args.workers)
+        if failed:
+            print(f"Error: {len(failed)} asset rule(s) failed: {' '.join(failed)}")
+            return 1
+        build_mipmaps(workers=args.workers)
+
+    if not args.no_latex:
+        precompile(workers=args.workers)
+
+    failed = render(args.slides or unique_slides(), args.workers, args.fps, resolution, args.force)
+    if failed:
+        print(f"Error: {len(failed)} slide(s) failed: {' '.join(failed)}")
+        return 1
+
+    apply_clips(args.slides or unique_slides())
+    if not args.no_convert:
+        convert(args.slides or deck(), args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
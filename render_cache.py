@@ -0,0 +1,199 @@
+import ast
+import glob
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from mipmaps import TIERS, variant_path
+
+
+ROOT = Path(__file__).resolve().parent
+CACHE_FILE = ROOT / '.render_cache.json'
+SLIDES_FOLDER = ROOT / 'slides'
+
+
+def file_digest(path) -> str:
+    """Hash the content of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_module(path):
+    path = Path(path)
+    source = path.read_text()
+    return source, ast.parse(source, filename=str(path))
+
+
+def local_imports(tree) -> dict:
+    """Map names imported from local (repo) modules onto the module file"""
+    imported = {}
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            path = ROOT / (node.module.replace('.', '/') + '.py')
+            if path.is_file():
+                for alias in node.names:
+                    imported[alias.asname or alias.name] = path
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                path = ROOT / (alias.name.replace('.', '/') + '.py')
+                if path.is_file():
+                    imported[alias.asname or alias.name] = path
+    return imported
+
+
+def module_closure(paths) -> set:
+    """All local modules reachable from paths through their imports"""
+    seen = set()
+    todo = list(paths)
+    while todo:
+        path = todo.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        _, tree = parse_module(path)
+        todo.extend(local_imports(tree).values())
+    return seen
+
+
+def asset_patterns(node) -> set:
+    """Glob patterns for every file path that appears as a string in node
+
+    Formatted strings such as f'images/logits_Layer_{i + 1}.png' become
+    wildcards, so all files the loop may open are part of the hash.
+    """
+    patterns = set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.JoinedStr):
+            pattern = ''.join(
+                v.value if isinstance(v, ast.Constant) else '*' for v in child.values
+            )
+        elif isinstance(child, ast.Constant) and isinstance(child.value, str):
+            pattern = child.value
+        else:
+            continue
+        if '/' in pattern or '.' in pattern:
+            if any(Path(p).is_file() for p in glob.glob(str(ROOT / pattern))):
+                patterns.add(pattern)
+    return patterns
+
+
+class SceneSources:
+    """Statically extracted sources of all slides in a scene file"""
+
+    def __init__(self, path=ROOT / 'scene.py'):
+        self.path = Path(path)
+        source, tree = parse_module(self.path)
+        self.classes = {}
+        preamble = []
+        for node in tree.body:
+            if isinstance(node, ast.ClassDef):
+                # later definitions override earlier ones, as they do on import
+                self.classes[node.name] = node
+            else:
+                preamble.append(ast.get_source_segment(source, node))
+        self.source = source
+        self.preamble = '\n'.join(preamble)
+        self.imports = local_imports(tree)
+
+    def lineage(self, name) -> list:
+        """The class itself followed by its base classes defined in this file"""
+        nodes = []
+        todo = [name]
+        while todo:
+            node = self.classes.get(todo.pop(0))
+            if node is None or node in nodes:
+                continue
+            nodes.append(node)
+            todo.extend(b.id for b in node.bases if isinstance(b, ast.Name))
+        return nodes
+
+    def dependencies(self, name) -> dict:
+        """Everything the render of slide `name` depends on, as {label: digest}"""
+        nodes = self.lineage(name)
+        if not nodes:
+            raise KeyError(f'no slide named {name} in {self.path}')
+        used = {n.id for node in nodes for n in ast.walk(node) if isinstance(n, ast.Name)}
+        modules = module_closure(
+            path for imported, path in self.imports.items() if imported in used
+        )
+        assets = set()
+        for node in nodes:
+            for pattern in asset_patterns(node):
+                assets.update(p for p in glob.glob(str(ROOT / pattern)) if Path(p).is_file())
+
+        dependencies = {
+            'source:' + node.name: hashlib.sha256(
+                ast.get_source_segment(self.source, node).encode()
+            ).hexdigest()
+            for node in nodes
+        }
+        dependencies['preamble'] = hashlib.sha256(self.preamble.encode()).hexdigest()
+        for path in sorted(modules):
+            dependencies['module:' + str(path.relative_to(ROOT))] = file_digest(path)
+        for path in sorted(assets):
+            dependencies['asset:' + os.path.relpath(path, ROOT)] = file_digest(path)
+            # pre-scaled copies are what the render actually loads
+            for tier in TIERS:
+                variant = variant_path(path, tier)
+                if variant.is_file():
+                    dependencies['mipmap:' + os.path.relpath(variant, ROOT)] = file_digest(variant)
+        return dependencies
+
+
+def render_config(**config) -> dict:
+    """Render settings and tool versions which influence the rendered output"""
+    from importlib import metadata
+    for package in ['manim', 'manim-slides']:
+        try:
+            config[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            config[package] = None
+    return config
+
+
+def slide_digest(sources: SceneSources, name: str, config: dict) -> str:
+    digest = hashlib.sha256()
+    digest.update(json.dumps(sources.dependencies(name), sort_keys=True).encode())
+    digest.update(json.dumps(config, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def outputs_exist(name) -> bool:
+    """Check whether manim-slides output for slide `name` is still on disk"""
+    path = SLIDES_FOLDER / f'{name}.json'
+    try:
+        presentation = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return False
+    for slide in presentation.get('slides', []):
+        for key in ['file', 'rev_file']:
+            if key in slide and not (ROOT / slide[key]).exists():
+                return False
+    return True
+
+
+class RenderCache:
+    """Per-slide content hashes of the last successful render"""
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = Path(path)
+        try:
+            self.entries = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def is_fresh(self, name: str, digest: str) -> bool:
+        return self.entries.get(name) == digest and outputs_exist(name)
+
+    def update(self, name: str, digest: str):
+        self.entries[name] = digest
+
+    def invalidate(self, name: str):
+        self.entries.pop(name, None)
+
+    def save(self):
+        self.path.write_text(json.dumps(self.entries, indent=2, sort_keys=True))
@@ -1,20 +1,21 @@
-import glob
+import os
 from functools import partial
 
 import numpy as np
 
 from manim import (
     Scene, VGroup, DrawBorderThenFill, Circumscribe, Create, PI, Group,
-    Circle, Square, Text, SVGMobject, ImageMobject, Rectangle, CubicBezier, Tex,
+    Circle, Square, SVGMobject, Rectangle, CubicBezier,
     Line, Dot, NumberLine, ValueTracker, Vector, DashedLine, Arrow, StealthTip,
-    RoundedRectangle, MathTex, DecimalNumber, Axes, CurvedArrow, ThreeDAxes,
-    Sphere, DashedVMobject, ImageMobject, SurroundingRectangle, TexTemplate,
+    RoundedRectangle, DecimalNumber, Axes, CurvedArrow, ThreeDAxes,
+    Sphere, DashedVMobject, SurroundingRectangle, TexTemplate,
     FadeIn, Transform, FadeOut, AnimationGroup, Succession, Write, Uncreate,
     MoveToTarget, ReplacementTransform, Wait, AddTextLetterByLetter, Brace,
     MoveAlongPath, LaggedStart,
     f_always, linear, always,
     WHITE, BLACK, ManimColor, BLUE, RED, GRAY, DARK_GRAY,
     DOWN, LEFT, RIGHT, UP, ORIGIN, UL, UR, DR,
+    config,
 )
 from manim.utils.rate_functions import ease_in_out_expo
 from manim_slides import Slide, ThreeDSlide
@@ -24,6 +25,12 @@ from particles import create_circles, get_electron, get_nucleus, get_nucleus_tex
 from periodic_table import generate_periodic_table, get_element
 from quantum import generate_hatch_pattern
 from hydrogen import potential, harmonic
+from clips import record as record_clips, forget as forget_clips
+from imagecache import ImageMobject
+from layers import LayeredFigure
+from manifest import overlay
+from textcache import Text, Tex, MathTex
+from video import VideoMobject
 
 
 TITLE_FONT_SIZE = 14
@@ -42,8 +49,81 @@ tex_template = TexTemplate(preamble='\\usepackage{amsmath}\n\\usepackage{esvect}
 
 SLIDE_NUMBER_FONTSIZE = 25
 
-
-class Title(Slide):
+# set STILL_FRAMES=0 to render static sections at their full duration
+STILL_FRAMES = os.environ.get('STILL_FRAMES', '1') != '0'
+# set CLIP_PASSTHROUGH=0 to render clips frame by frame instead of embedding them
+CLIP_PASSTHROUGH = os.environ.get('CLIP_PASSTHROUGH', '1') != '0'
+
+
+def slide_number(slide):
+    """Slide number overlay, as derived from the deck order in manifest.py"""
+    number, color = overlay(type(slide).__name__)
+    if number is None:
+        return VGroup()
+    return Text(str(number), color=color, font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR)
+
+
+class StillSlide(Slide):
+    """Slide which renders sections that only wait on a still image as one frame
+
+    A Wait without updaters in the scene produces identical frames, which are
+    still rasterized and encoded one by one. Since the presentation pauses on
+    the last frame of each section anyway, a single frame shows the same.
+    """
+
+    def is_still(self, animations) -> bool:
+        return all(
+            isinstance(animation, Wait) and animation.stop_condition is None
+            for animation in animations
+        ) and not self.should_update_mobjects()
+
+    def play(self, *animations, **kwargs):
+        if STILL_FRAMES and animations and self.is_still(animations):
+            animations = [Wait(1 / config.frame_rate)]
+            kwargs.pop('run_time', None)
+        super().play(*animations, **kwargs)
+
+
+class ClipSlide(Slide):
+    """Slide with sections that play a source video as is
+
+    Such a section is rendered as a single placeholder frame; clips.py then
+    points it at the source video in the manim-slides output, which the HTML
+    export and the presenter play instead of a re-rendered copy.
+    """
+
+    def setup(self):
+        super().setup()
+        self.sections = 0
+        self.clips = []
+        forget_clips(type(self).__name__)
+
+    def next_slide(self, *args, **kwargs):
+        super().next_slide(*args, **kwargs)
+        self.sections += 1
+
+    def clip(self, path: str, fps: float = None, scale: float = 1.0):
+        """Show the video at path in the current section, at fps frames/second"""
+        video = VideoMobject(path, fps=fps).scale(scale)
+        if not CLIP_PASSTHROUGH:
+            self.add(video.start())
+            self.wait(video.duration)
+            video.stop()
+            return video
+
+        # the section ends on the last frame of the clip
+        self.add(video.seek(video.duration))
+        self.wait(1 / config.frame_rate)
+        self.clips.append({
+            'section': self.sections,
+            'source': path,
+            'speed': video.fps / video.reader.fps,
+        })
+        record_clips(type(self).__name__, self.clips)
+        return video
+
+
+class Title(StillSlide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
@@ -52,11 +132,11 @@ class Title(Slide):
         self.wait()
 
 
-class Particles(Slide):  # 1
+class Particles(Slide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("1", font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
         globe = SVGMobject('images/globe_color.svg')
         globe.scale(2)
 
@@ -132,7 +212,7 @@ class Particles(Slide):  # 1
         self.next_slide()
 
 
-class PeriodicTable(Slide):  # 2
+class PeriodicTable(Slide):
 
     def highlight(self, elements, boxes):
         self.wait_time_between_slides = 0.05
@@ -167,7 +247,7 @@ class PeriodicTable(Slide):  # 2
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("2", font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
         boxes = generate_periodic_table()
         table = VGroup(*sum(boxes.values(), start=())).center().shift(1.3 * UP)
         self.play(Create(table), run_time=1)
@@ -223,11 +303,11 @@ class PeriodicTable(Slide):  # 2
         self.next_slide()
 
 
-class Masses(Slide):  # 3
+class Masses(Slide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("3", font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
         positions = 2 * np.array([
             [-0.1, 0.3, 0],
             [0.7, 0.5, 0],
@@ -541,11 +621,11 @@ class Masses(Slide):  # 3
         self.next_slide()
 
 
-class Dynamics(Slide):  # 4
+class Dynamics(Slide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("4", font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
         equilibrium_distance = 1.5
         positions = np.array([
             [equilibrium_distance / 2, 0, 0],
@@ -695,11 +775,11 @@ class Dynamics(Slide):  # 4
         self.next_slide()
 
 
-class OverviewPhysics(Slide):  # 5
+class OverviewPhysics(Slide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("5", font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
 
         boxes = generate_periodic_table()
         table = VGroup(*sum(boxes.values(), start=())).center().shift(1.3 * UP)
@@ -767,11 +847,11 @@ class OverviewPhysics(Slide):  # 5
         # self.next_slide()
 
 
-class TimeEvolution(Slide):  # 6
+class TimeEvolution(Slide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("6", font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
         frequency = 119e12 * 1e-15  # period ~ 8 fs
         time_offset = 2
 
@@ -927,14 +1007,13 @@ class TimeEvolution(Slide):  # 6
         self.next_slide()
 
 
-class TimeScales(Slide):  # 7
+class TimeScales(StillSlide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("7", font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
         files = [f'images/timescales/timescales_Layer_{i + 2}.png' for i in range(4)]
-        parts = Group(*[ImageMobject(file).center().scale(0.5) for file in files])
-        parts.scale(0.8).shift(UP)
+        parts = LayeredFigure(files).scale(0.5 * 0.8).shift(UP)
 
         amino = Text(
             'amino acid',
@@ -951,8 +1030,9 @@ class TimeScales(Slide):  # 7
 
         labels = [amino]
 
-        for i, part in enumerate(parts):
-            self.add(part)
+        self.add(parts)
+        for i in range(len(files)):
+            parts.reveal()
             self.play(Wait())
             self.next_slide()
 
@@ -1038,11 +1118,11 @@ class Pareto(Slide):
         self.next_slide()
 
 
-class Overview(Slide):  # 8
+class Overview(Slide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("8", font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
 
         boxes = generate_periodic_table()
         table = VGroup(*sum(boxes.values(), start=())).center().shift(1.3 * UP)
@@ -1111,11 +1191,11 @@ class Overview(Slide):  # 8
         self.next_slide()
 
 
-class HydrogenRevisited(Slide):  # 9
+class HydrogenRevisited(Slide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("9", font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
         axes = Axes((0.0, 8), (-1, 1), x_length=7).scale(0.7).shift(0.5 * LEFT)
         axes.shift(3.0 * LEFT)
         xlabel = Text(
@@ -1214,11 +1294,11 @@ class HydrogenRevisited(Slide):  # 9
         self.next_slide()
 
 
-class Priors(Slide):  # 10
+class Priors(Slide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("10", font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
         title = Tex(
             r"\sffamily learning a mapping: XYZ $\longrightarrow$ energy",
         ).to_corner(UP + LEFT)
@@ -1340,11 +1420,11 @@ class Priors(Slide):  # 10
         self.next_slide()
 
 
-class Dimensionality(Slide):  # 11
+class Dimensionality(Slide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("11", font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
 
         title = Text(
             "the curse of dimensionality",
@@ -1486,11 +1566,11 @@ class Dimensionality(Slide):  # 11
         self.next_slide()
 
 
-class Images(Slide):  # 12
+class Images(Slide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("12", font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
 
         title = Tex(r"\sffamily analogy: images")
         title.to_corner(UL)
@@ -1556,7 +1636,7 @@ class Images(Slide):  # 12
         self.next_slide()
 
 
-class Network(Slide):  # 13
+class Network(Slide):
 
     def network(self, *sizes):
         layers = []
@@ -1595,7 +1675,7 @@ class Network(Slide):  # 13
     def construct(self):
         # "a systematic way of building complex functions"
         self.wait_time_between_slides = 0.05
-        self.add(Text("13", font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
         title = Text(
             "neural networks",
             font='Open Sans',
@@ -1661,7 +1741,7 @@ class Network(Slide):  # 13
         self.next_slide()
 
 
-class GNN(Slide):  # 14
+class GNN(Slide):
 
     def points(self):
         return np.array([
@@ -1751,7 +1831,7 @@ class GNN(Slide):  # 14
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("14", font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
 
         title = Text(
             "geometric graph neural networks",
@@ -1908,11 +1988,11 @@ class GNN(Slide):  # 14
         self.next_slide()
 
 
-class OverviewGNN(Slide):  # 15
+class OverviewGNN(Slide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("15", font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
 
         boxes = generate_periodic_table()
         table = VGroup(*sum(boxes.values(), start=())).center().shift(1.3 * UP)
@@ -1990,7 +2070,7 @@ class OverviewGNN(Slide):  # 15
         self.next_slide()
 
 
-class Three(Slide):  # 16
+class Three(Slide):
 
     def gnn(self):
         message_passing = Text(
@@ -2031,7 +2111,7 @@ class Three(Slide):  # 16
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("16", font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
         title = Text(
             "so... the phd itself?",
             font='Open Sans',
@@ -2153,11 +2233,11 @@ class Three(Slide):  # 16
         self.next_slide()
 
 
-class Systems(Slide):  # 17
+class Systems(StillSlide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("17", color=BLACK, font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
         background = Square(15, fill_color=WHITE, fill_opacity=1.0, z_index=-1)
         self.add(background)
         title = Text(
@@ -2199,11 +2279,11 @@ class Systems(Slide):  # 17
         self.next_slide()
 
 
-class QM(Slide):  # 18
+class QM(Slide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("18", color=BLACK, font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
         background = Square(15, fill_color=WHITE, fill_opacity=1.0, z_index=-1)
         self.add(background)
         title = Text(
@@ -2247,26 +2327,24 @@ class QM(Slide):  # 18
         self.next_slide()
 
 
-class HPC(Slide):  # 19
+class HPC(StillSlide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("19", color=BLACK, font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
         background = Square(15, fill_color=WHITE, fill_opacity=1.0, z_index=-1)
         self.add(background)
 
-        axes = ImageMobject('images/top500_Layer_1.png')
-        data = ImageMobject('images/top500_Layer_2.png')
-        Group(axes, data).shift(0.5 * DOWN + 0.5 * RIGHT)
-        self.add(axes)
-        self.play(Wait())
-        self.next_slide()
-        self.add(data)
-        self.play(Wait())
-        self.next_slide()
+        figure = LayeredFigure(['images/top500_Layer_1.png', 'images/top500_Layer_2.png'])
+        figure.shift(0.5 * DOWN + 0.5 * RIGHT)
+        self.add(figure)
+        for i in range(2):
+            figure.reveal()
+            self.play(Wait())
+            self.next_slide()
 
 
-class LUMI(Slide):  # 20
+class LUMI(StillSlide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
@@ -2276,7 +2354,7 @@ class LUMI(Slide):  # 20
         self.next_slide()
 
 
-class OnlineLearning(Slide):  # 21
+class OnlineLearning(Slide):
 
     def new_walkers(self, nwalkers):
         walkers = VGroup(*[Dot(color=BLACK, z_index=1) for i in range(nwalkers)])
@@ -2317,7 +2395,7 @@ class OnlineLearning(Slide):  # 21
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("20", color=BLACK, font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
         background = Square(15, fill_color=WHITE, fill_opacity=1.0, z_index=-1)
         self.add(background)
         circle = Circle(
@@ -2447,11 +2525,11 @@ class OnlineLearning(Slide):  # 21
         self.next_slide()
 
 
-class Hardware(Slide):  # 22
+class Hardware(StillSlide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("22", color=BLACK, font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
 
         background = Square(15, fill_color=WHITE, fill_opacity=1.0, z_index=-1)
         self.add(background)
@@ -2465,22 +2543,20 @@ class Hardware(Slide):  # 22
         ).scale(0.1 * 3 / 2).to_corner(UL)
         self.add(title)
 
-        image = None
+        files = [f'images/hardware/workflow_Layer_{i + 1}.png' for i in range(8)]
+        image = LayeredFigure(files).scale(0.6).shift(0.5 * DOWN)
+        self.add(image)
         for i in range(8):
-            path = f'images/hardware/workflow_Layer_{i + 1}.png'
-            # if image is not None:
-            #     self.remove(image)
-            image = ImageMobject(path).scale(0.6).shift(0.5 * DOWN)
-            self.add(image)
+            image.reveal()
             self.play(Wait())
             self.next_slide()
 
 
-class Psiflow(Slide):  # 23
+class Psiflow(StillSlide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("23", color=BLACK, font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
 
         background = Square(15, fill_color=WHITE, fill_opacity=1.0, z_index=-1)
         self.add(background)
@@ -2491,7 +2567,7 @@ class Psiflow(Slide):  # 23
         self.next_slide()
 
 
-class ThreeReview(Slide):  # 24
+class ThreeReview(Slide):
 
     def gnn(self):
         message_passing = Text(
@@ -2532,7 +2608,7 @@ class ThreeReview(Slide):  # 24
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("24", font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
         title = Text(
             "so... the phd itself?",
             font='Open Sans',
@@ -2629,38 +2705,26 @@ class ThreeReview(Slide):  # 24
         self.next_slide()
 
 
-class Movie(Slide):  # 25
+class Movie(ClipSlide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("25", color=BLACK, font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
         background = Square(15, fill_color=WHITE, fill_opacity=1.0, z_index=-1)
         self.add(background)
         self.play(Wait())
         self.next_slide()
 
-        files = sorted(list(glob.glob('images/movie/frame_*.jpg')))
-        block = 30
-        for block_index in range(len(files) // block + 1):
-            start = block_index * block
-            stop = min((block_index + 1) * block, len(files))
-            print(files[start:stop])
-            images = [ImageMobject(file).scale(0.9) for file in files[start:stop]]
-            anims = []
-            for image in images:
-                anims.append(FadeIn(image, run_time=0.001))
-                anims.append(Wait(1 / 30))
-            self.play(Succession(*anims), run_time=block / 20)  # somehow breaks at 30?
-            for image in images[:-1]:  # keep last image to not have flashing white screen
-                self.remove(image)
+        # played at 20 frames per second; the last frame stays on screen
+        self.clip('images/movie/movie.mp4', fps=20, scale=0.9)
         self.next_slide()
 
 
-class Features(Slide):  # 26
+class Features(StillSlide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("26", color=BLACK, font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
         background = Square(15, fill_color=WHITE, fill_opacity=1.0, z_index=-1)
         self.add(background)
 
@@ -2670,19 +2734,20 @@ class Features(Slide):  # 26
         self.play(Wait())
         self.next_slide()
 
+        files = [f'images/scatter_Layer_{i + 1}.png' for i in range(5)]
+        image = LayeredFigure(files).scale(0.7).to_corner(DR, buff=0.1)
+        self.add(image)
         for i in range(5):
-            path = f'images/scatter_Layer_{i + 1}.png'
-            image = ImageMobject(path).scale(0.7).to_corner(DR, buff=0.1)
-            self.add(image)
+            image.reveal()
             self.play(Wait())
             self.next_slide()
 
 
-class DeltaLearning(Slide):  # 27
+class DeltaLearning(Slide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("27", font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
 
         title = Text(
             "good = bad + (good - bad)",
@@ -2760,28 +2825,29 @@ class DeltaLearning(Slide):  # 27
         self.next_slide()
 
 
-class DeltaLearningFigure(Slide):  # 28
+class DeltaLearningFigure(StillSlide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("28", color=BLACK, font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
 
         background = Square(15, fill_color=WHITE, fill_opacity=1.0, z_index=-1)
         self.add(background)
 
+        files = [f'images/delta_learning_Layer_{i + 1}.png' for i in range(4)]
+        image = LayeredFigure(files).scale(0.6)
+        self.add(image)
         for i in range(4):
-            path = f'images/delta_learning_Layer_{i + 1}.png'
-            image = ImageMobject(path).scale(0.6)
-            self.add(image)
+            image.reveal()
             self.play(Wait())
             self.next_slide()
 
 
-class IsobuteneProfile(Slide):  # 29
+class IsobuteneProfile(StillSlide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("29", color=BLACK, font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
         background = Square(15, fill_color=WHITE, fill_opacity=1.0, z_index=-1)
         self.add(background)
 
@@ -2797,162 +2863,11 @@ class IsobuteneProfile(Slide):  # 29
         self.next_slide()
 
 
-class ThreeFinal(Slide):  # 30
-
-    def gnn(self):
-        message_passing = Text(
-            "message passing:",
-            font='Open Sans',
-            font_size=250,
-        ).scale(0.1)
-        from_xyz = Tex(r"$\text{\sffamily XYZ} \longrightarrow \quad$").next_to(message_passing, RIGHT)
-        squares = []
-        for color in MESSAGE_COLORS:
-            square = Square(
-                0.3,
-                stroke_color=WHITE,
-                fill_color=color,
-                fill_opacity=1.0,
-                stroke_width=1.5,
-            )
-            squares.append(square)
-        feats = VGroup(*squares[::-1]).arrange(DOWN, buff=0).next_to(from_xyz, RIGHT)
-
-        readout = Text(
-            "readout:",
-            font='Open Sans',
-            font_size=250,
-        ).scale(0.1).next_to(message_passing, 3 * DOWN, aligned_edge=LEFT)
-        f_read = Tex(r"$f_{\text{\sffamily read}}(\quad) = E_i$").next_to(readout, 2 * RIGHT)
-        arg = feats.copy().move_to(f_read.get_center() + 0.14 * LEFT)
-
-        content = VGroup(message_passing, from_xyz, feats, readout, f_read, arg)
-        border = SurroundingRectangle(content, color=WHITE, buff=0.2)
-        title = Text(
-            "GNN",
-            font='Open Sans',
-            font_size=250,
-            weight="BOLD",
-        ).scale(0.1).next_to(border, 0.5 * UP, aligned_edge=LEFT)
-        return content, border, title
+class IsobuteneBasins(StillSlide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("30", font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
-        title = Text(
-            "so... the phd itself?",
-            font='Open Sans',
-            font_size=250,
-        ).scale(0.13).to_corner(UL)
-        self.add(title)
-
-        content, border, title = self.gnn()
-        gnn = VGroup(content, border, title).center()
-        self.add(content, gnn)
-
-        numbers = []
-        for i in range(3):
-            circle = Circle(
-                radius=0.25,
-                fill_color=WHITE,
-                fill_opacity=1.0,
-                stroke_color=WHITE,
-                z_index=0,
-            )
-            number = Text(
-                str(i + 1),
-                font="Open Sans",
-                font_size=250,
-                color=BLACK,
-                z_index=1,
-                weight="BOLD",
-            ).scale(0.1)
-            number.move_to(circle.get_center())
-            if i == 0:
-                number.shift(0.02 * LEFT)
-            numbers.append(VGroup(number, circle))
-        gnumbers = VGroup(*numbers).arrange(DOWN, buff=1.5).shift(6.5 * LEFT + 0.5 * DOWN)
-        gnn.scale(0.7).to_corner(UR)
-        self.add(*[e for n in numbers for e in n])
-
-        training = r"$\text{\sffamily GNN} \longleftarrow"
-        training += r"\left\{\text{\sffamily XYZ}, E, \vec{F}\right\}$"
-        training = Tex(training, tex_template=tex_template).next_to(numbers[0], RIGHT)
-        self.add(training.scale(0.9))
-        catch = Text(
-            "on-the-fly learning!",
-            color=ELECTRON_COLOR,
-            font='Open Sans',
-            font_size=300,
-        ).scale(0.1).next_to(training, 0.5 * DOWN, aligned_edge=LEFT)
-        self.add(catch)
-
-        no_F = Text(
-            "most accurate QM methods can only do ",
-            color=WHITE,
-            font='Open Sans',
-            font_size=200,
-        ).scale(0.1 * 3 / 2).next_to(numbers[1], 2 * RIGHT)
-        F = Tex(r"$\left\{\text{\sffamily XYZ}, E\right\}$", tex_template=tex_template).next_to(
-            no_F,
-            RIGHT,
-        ).shift(0.0 * UP)
-        transfer = Text(
-            "transfer learning!",
-            color=ELECTRON_COLOR,
-            font='Open Sans',
-            font_size=300,
-        ).scale(0.1).next_to(no_F, 0.5 * DOWN, aligned_edge=LEFT)
-        self.add(no_F)
-        self.add(F)
-        self.add(transfer)
-
-        texts = ['computational cost = ', '# steps ', ' x  (cost/step)']
-        mtexts = []
-        for text in texts:
-            mtext = Text(
-                text,
-                font='Open Sans',
-                font_size=200,
-                fill_color=WHITE,
-                fill_opacity=1.0,
-            ).scale(0.1 * 3 / 2)
-            mtexts.append(mtext)
-        VGroup(*mtexts).arrange(RIGHT, buff=0.2).next_to(numbers[2], 2 * RIGHT)
-        self.add(*mtexts)
-
-        to_gray = VGroup(mtexts[0], mtexts[2])
-        to_gray.set_color(DARK_GRAY)
-        feats = content[2].copy().set_y(no_F.get_y())
-        feats_ = content[2].copy().set_y(mtexts[0].get_y())
-        self.add(feats)
-        self.add(feats_)
-
-        self.play(Wait())
-        self.next_slide()
-
-        sbc = Text(
-            "classification (A|B)",
-            color=ELECTRON_COLOR,
-            font='Open Sans',
-            font_size=300,
-        ).scale(0.1).next_to(mtexts[0], 0.5 * DOWN, aligned_edge=LEFT)
-        target = Text(
-            "targeted simulation: A to B",
-            color=ELECTRON_COLOR,
-            font='Open Sans',
-            font_size=300,
-        ).scale(0.1).next_to(sbc, RIGHT, buff=1)
-        self.play(AddTextLetterByLetter(sbc), run_time=0.5)
-        self.play(AddTextLetterByLetter(target), run_time=0.5)
-        self.next_slide()
-
-
-class IsobuteneBasins(Slide):  # 31
-
-    def construct(self):
-        self.wait_time_between_slides = 0.05
-        self.add(Text("31", color=BLACK, font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
         background = Square(15, fill_color=WHITE, fill_opacity=1.0, z_index=-1)
         self.add(background)
 
@@ -2961,19 +2876,20 @@ class IsobuteneBasins(Slide):  # 31
         self.play(Wait())
         self.next_slide()
 
+        files = [f'images/coordination_labeled_Layer_{i + 1}.png' for i in range(3)]
+        image = LayeredFigure(files).scale(0.65).to_edge(RIGHT, buff=0.1)
+        self.add(image)
         for i in range(3):
-            path = f'images/coordination_labeled_Layer_{i + 1}.png'
-            image = ImageMobject(path).scale(0.65).to_edge(RIGHT, buff=0.1)
-            self.add(image)
+            image.reveal()
             self.play(Wait())
             self.next_slide()
 
 
-class ManualLikelihood(Slide):  # 32
+class ManualLikelihood(StillSlide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("32", color=BLACK, font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
         background = Square(15, fill_color=WHITE, fill_opacity=1.0, z_index=-1)
         self.add(background)
 
@@ -2993,11 +2909,11 @@ class ManualLikelihood(Slide):  # 32
         self.next_slide()
 
 
-class PhaseLearningFigure(Slide):  # 33
+class PhaseLearningFigure(StillSlide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("33", color=BLACK, font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
 
         background = Square(15, fill_color=WHITE, fill_opacity=1.0, z_index=-1)
         self.add(background)
@@ -3012,10 +2928,11 @@ class PhaseLearningFigure(Slide):  # 33
         self.play(Wait())
         self.next_slide()
 
+        files = [f'images/logits_Layer_{i + 1}.png' for i in range(4)]
+        image = LayeredFigure(files).scale(0.6)
+        self.add(image)
         for i in range(4):
-            path = f'images/logits_Layer_{i + 1}.png'
-            image = ImageMobject(path).scale(0.6)
-            self.add(image)
+            image.reveal()
             self.play(Wait())
             self.next_slide()
 
@@ -3024,11 +2941,11 @@ class PhaseLearningFigure(Slide):  # 33
         # )
 
 
-class LearnedLikelihood(Slide):  # 34
+class LearnedLikelihood(Slide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("34", color=BLACK, font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
 
         background = Square(15, fill_color=WHITE, fill_opacity=1.0, z_index=-1)
         self.add(background)
@@ -3052,11 +2969,11 @@ class LearnedLikelihood(Slide):  # 34
         self.next_slide()
 
 
-class MIL53(Slide):
+class MIL53(StillSlide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("34", color=BLACK, font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
 
         background = Square(15, fill_color=WHITE, fill_opacity=1.0, z_index=-1)
         self.add(background)
@@ -3080,28 +2997,29 @@ class MIL53(Slide):
         self.next_slide()
 
 
-class Learning(Slide):  # 35
+class Learning(StillSlide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("35", color=BLACK, font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
 
         background = Square(15, fill_color=WHITE, fill_opacity=1.0, z_index=-1)
         self.add(background)
 
+        files = [f'images/learning_{i + 1}.png' for i in range(5)]
+        image = LayeredFigure(files).scale(0.6)
+        self.add(image)
         for i in range(5):
-            path = f'images/learning_{i + 1}.png'
-            image = ImageMobject(path).scale(0.6)
-            self.add(image)
+            image.reveal()
             self.play(Wait())
             self.next_slide()
 
 
-class Performance(Slide):  # 36
+class Performance(Slide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("36", color=BLACK, font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
 
         background = Square(15, fill_color=WHITE, fill_opacity=1.0, z_index=-1)
         self.add(background)
@@ -3135,7 +3053,7 @@ class Performance(Slide):  # 36
         self.next_slide()
 
 
-class ThreeFinal(Slide):  # 37
+class ThreeFinal(Slide):
 
     def gnn(self):
         message_passing = Text(
@@ -3176,7 +3094,7 @@ class ThreeFinal(Slide):  # 37
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("38", font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
         title = Text(
             "so... the phd itself?",
             font='Open Sans',
@@ -3284,11 +3202,11 @@ class ThreeFinal(Slide):  # 37
         self.next_slide()
 
 
-class Acknowledgements(Slide):
+class Acknowledgements(StillSlide):
 
     def construct(self):
         self.wait_time_between_slides = 0.05
-        self.add(Text("35", color=BLACK, font_size=SLIDE_NUMBER_FONTSIZE).to_corner(DR))
+        self.add(slide_number(self))
 
         background = Square(15, fill_color=WHITE, fill_opacity=1.0, z_index=-1)
         self.add(background)
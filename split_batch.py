@@ -0,0 +1,166 @@
+import json
+import mmap
+import os
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from render_cache import file_digest
+
+
+ROOT = Path(__file__).resolve().parent
+STATE_FILE = ROOT / '.split_cache.json'
+# seconds between two looks at the watched files
+WATCH_INTERVAL = 0.2
+
+# split(path, workers) splits one SVG and returns the files it wrote; pattern
+# finds the SVGs the splitter applies to, and options are the command line
+# settings that make a previous run out of date when they change
+Splitter = namedtuple('Splitter', ['name', 'sources', 'pattern', 'split', 'options'])
+
+
+def matches(path, pattern: bytes) -> bool:
+    """Whether the content of a file matches pattern, without reading it whole"""
+    with open(path, 'rb') as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return re.search(pattern, data) is not None
+        except ValueError:
+            # empty files cannot be mapped
+            return False
+
+
+def svg_files(paths, excluded=()) -> list:
+    """SVG files in paths, which are files or directories searched recursively"""
+    found = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            found.extend(sorted(path.rglob('*.svg')))
+        elif path.is_file():
+            found.append(path)
+    return [path.resolve() for path in found if path.resolve() not in excluded]
+
+
+class SplitState:
+    """Hashes of each SVG and of its splitter at the last split, and the files it wrote"""
+
+    def __init__(self, path=STATE_FILE):
+        self.path = Path(path)
+        self.entries = self.load()
+        self.changed = {}
+
+    def load(self) -> dict:
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def key(splitter: Splitter, path) -> str:
+        return f'{splitter.name}:{os.path.relpath(path, ROOT)}'
+
+    def current(self, splitter: Splitter, path) -> dict:
+        return {
+            'source': file_digest(path),
+            'splitter': {source: file_digest(ROOT / source) for source in splitter.sources},
+            'options': [str(option) for option in splitter.options],
+        }
+
+    def is_stale(self, splitter: Splitter, path) -> bool:
+        entry = self.entries.get(self.key(splitter, path))
+        if entry is None or any(not (ROOT / output).exists() for output in entry['outputs']):
+            return True
+        return {k: v for k, v in entry.items() if k != 'outputs'} != self.current(splitter, path)
+
+    def record(self, splitter: Splitter, path, outputs):
+        entry = self.current(splitter, path)
+        entry['outputs'] = [os.path.relpath(output, ROOT) for output in outputs or []]
+        self.entries[self.key(splitter, path)] = self.changed[self.key(splitter, path)] = entry
+
+    def outputs(self) -> set:
+        """Files written by previous splits, which are never split themselves"""
+        return {
+            (ROOT / output).resolve()
+            for entry in self.entries.values() for output in entry['outputs']
+        }
+
+    def save(self):
+        # another splitter may have saved since this state was loaded
+        entries = self.load()
+        entries.update(self.changed)
+        self.path.write_text(json.dumps(entries, indent=2, sort_keys=True))
+
+
+def split_all(paths, splitter: Splitter, workers: int = None, force: bool = False,
+              state: SplitState = None) -> list:
+    """Split the SVGs in paths that changed since their last split, several at a time
+
+    Only files matching the splitter's pattern are split. Returns the files
+    that failed.
+    """
+    state = state or SplitState()
+    files = [
+        path for path in svg_files(paths, state.outputs())
+        if matches(path, splitter.pattern) and (force or state.is_stale(splitter, path))
+    ]
+    if not files:
+        print("All layered SVGs are up to date")
+        return []
+    workers = workers or os.cpu_count()
+    concurrent = min(len(files), workers)
+
+    def run(path):
+        print(f"Splitting {os.path.relpath(path)}")
+        try:
+            outputs = splitter.split(path, max(1, workers // concurrent))
+        except Exception as e:
+            print(f"Error splitting {os.path.relpath(path)}: {e}")
+            return path
+        state.record(splitter, path, outputs)
+        return None
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrent) as executor:
+            failed = [path for path in executor.map(run, files) if path is not None]
+    finally:
+        state.save()
+    return failed
+
+
+def stamps(paths, excluded) -> dict:
+    found = {}
+    for path in svg_files(paths, excluded):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        found[path] = (stat.st_mtime_ns, stat.st_size)
+    return found
+
+
+def watch(paths, splitter: Splitter, workers: int = None, interval: float = WATCH_INTERVAL):
+    """Split SVGs in paths again whenever they are saved, until interrupted
+
+    A file is split once it has not changed for one interval, so that it is
+    not read while an editor is still writing it.
+    """
+    state = SplitState()
+    previous = stamps(paths, state.outputs())
+    settled = dict(previous)
+    print(f"Watching {' '.join(map(str, paths))} for changes (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(interval)
+            current = stamps(paths, state.outputs())
+            ready = [
+                path for path, stamp in current.items()
+                if stamp == previous.get(path) and stamp != settled.get(path)
+            ]
+            previous = current
+            if ready:
+                split_all(ready, splitter, workers, state=state)
+                settled.update((path, current[path]) for path in ready)
+    except KeyboardInterrupt:
+        print("Stopped watching")
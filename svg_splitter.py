@@ -1,57 +1,282 @@
 import xml.etree.ElementTree as ET
 import re
 import argparse
+import io
+import itertools
 import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-import cairosvg
+from xml.sax.saxutils import escape
+from PIL import Image
 
-def hide_all_layers(root):
-    """Hide all layers in the SVG"""
-    ns = {'svg': 'http://www.w3.org/2000/svg',
-          'inkscape': 'http://www.inkscape.org/namespaces/inkscape'}
-    
-    for elem in root.findall(".//*[@inkscape:groupmode='layer']", ns):
-        style = elem.get('style', '')
-        # Remove any existing display properties
-        style = re.sub(r'display:\s*[^;]+;?', '', style)
-        # Add display:none
-        style = (style + ';display:none').lstrip(';')
-        elem.set('style', style)
-
-def show_layer(layer):
-    """Show specific layer and ensure it's visible"""
-    style = layer.get('style', '')
-    # Remove any display:none
-    style = re.sub(r'display:\s*none;?', '', style)
-    # Add display:inline
-    style = (style + ';display:inline').lstrip(';')
-    layer.set('style', style)
-
-def process_svg(input_file, output_dir, output_format='svg', dpi=300):
-    """Process SVG and split layers"""
+import deltas
+from layer_manifest import layer_entry, manifest_path, write_manifest
+from split_batch import Splitter, split_all, watch
+
+SVG = 'http://www.w3.org/2000/svg'
+INKSCAPE = 'http://www.inkscape.org/namespaces/inkscape'
+SODIPODI = 'http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd'
+ns = {'svg': SVG, 'inkscape': INKSCAPE}
+
+# top-level elements that are never drawn, and stay in every layer's output
+NOT_DRAWN = {f'{{{SVG}}}defs', f'{{{SVG}}}metadata', f'{{{SVG}}}style',
+             f'{{{SVG}}}title', f'{{{SVG}}}desc', f'{{{SODIPODI}}}namedview'}
+
+def base_style(elem):
+    """Style of an element without its display property"""
+    style = elem.get('style', '')
+    return re.sub(r'display:\s*[^;]+;?', '', style).rstrip(';')
+
+def display_style(base, display):
+    return (base + ';display:' + display).lstrip(';')
+
+def set_display(elem, base, display):
+    elem.set('style', display_style(base, display))
+
+def layer_documents(root):
+    """Yield (label, svg bytes) for each layer, showing only that layer
+
+    The tree is parsed once and modified in place: between two layers only
+    the display of the previous and the next layer (and their parent layers)
+    changes, so splitting stays linear in the number of layers. Top-level
+    elements that are not layers are hidden, except for defs and metadata.
+    """
+    layers = root.findall(".//*[@inkscape:groupmode='layer']", ns)
+    layer_set = set(layers)
+    styles = {layer: base_style(layer) for layer in layers}
+    parents = {}
+    for parent in root.iter():
+        for child in parent:
+            if child in layer_set:
+                parents[child] = parent
+
+    for child in root:
+        if child not in layer_set and child.tag not in NOT_DRAWN:
+            set_display(child, base_style(child), 'none')
+    for layer in layers:
+        set_display(layer, styles[layer], 'none')
+
+    def chain(layer):
+        while layer in layer_set:
+            yield layer
+            layer = parents.get(layer)
+
+    for index, layer in enumerate(layers):
+        for elem in chain(layer):
+            set_display(elem, styles[elem], 'inline')
+        label = layer.get(f'{{{INKSCAPE}}}label', '') or f'layer_{index}'
+        yield label, ET.tostring(root, encoding='utf-8', xml_declaration=True)
+        for elem in chain(layer):
+            set_display(elem, styles[elem], 'none')
+
+def root_tags(root):
+    """Opening and closing tag of an lxml root element, without its children"""
+    from lxml import etree
+    empty = etree.Element(root.tag, attrib=dict(root.attrib), nsmap=root.nsmap)
+    tag = etree.tostring(empty)
+    name = tag[1:].split(None, 1)[0].rstrip(b'/>')
+    return tag[:-2].rstrip() + b'>', b'</' + name + b'>'
+
+def stream_layer_documents(input_file):
+    """Stream the file with lxml; returns its root and an iterator like layer_documents
+
+    Each top-level element is serialized once, as soon as it has been
+    parsed, and then dropped from the tree, so at most one copy of the
+    document is held in memory. The styles of the layers in it are left as
+    placeholders, which each layer's document fills in to show that layer
+    and the layers it is in, exactly like layer_documents. The root
+    returned has no children. Its iterator is empty when the file has no
+    layers.
+    """
+    from lxml import etree
+    shared, chunks = [], []
+    root = None
+    depth = 0
+    count = 0
+    for event, elem in etree.iterparse(str(input_file), events=('start', 'end'), huge_tree=True):
+        if event == 'start':
+            root = elem if root is None else root
+            depth += 1
+            continue
+        depth -= 1
+        if depth != 1:
+            continue
+        layers = [e for e in elem.iter(etree.Element) if e.get(f'{{{INKSCAPE}}}groupmode') == 'layer']
+        numbers = {layer: number for number, layer in enumerate(layers)}
+        entries = []
+        for index, layer in enumerate(layers, count):
+            label = layer.get(f'{{{INKSCAPE}}}label', '') or f'layer_{index}'
+            # the layer and the layers it is in
+            chain = set()
+            while layer in numbers:
+                chain.add(numbers[layer])
+                layer = layer.getparent()
+            entries.append((label, chain))
+        count += len(layers)
+        if elem.tag in NOT_DRAWN:
+            shared.append(etree.tostring(elem, with_tail=False))
+        if elem.get(f'{{{INKSCAPE}}}groupmode') == 'layer':
+            styles = [base_style(layer) for layer in layers]
+            for number, layer in enumerate(layers):
+                layer.set('style', f'{{{{layer {number}}}}}')
+            chunks.append((etree.tostring(elem, with_tail=False), styles, entries))
+        else:
+            # layers in other top-level elements are hidden with them
+            chunks.append((b'', [], entries))
+        # done with this element and everything before it
+        elem.clear()
+        while elem.getprevious() is not None:
+            del root[0]
+    del root[:]
+    opening, closing = root_tags(root)
+
+    def documents():
+        header = b"<?xml version='1.0' encoding='utf-8'?>\n" + opening + b''.join(shared)
+        while chunks:
+            chunk, styles, entries = chunks.pop(0)
+            for label, chain in entries:
+                def style(match, chain=chain):
+                    number = int(match.group(1))
+                    display = 'inline' if number in chain else 'none'
+                    return escape(display_style(styles[number], display), {'"': '&quot;'}).encode()
+                yield label, header + re.sub(rb'\{\{layer (\d+)\}\}', style, chunk) + closing
+
+    return root, documents()
+
+# files that hold Inkscape layers
+LAYERED = rb'groupmode=["\']layer["\']'
+
+# CSS pixels per unit
+UNITS = {'': 1, 'px': 1, 'pt': 96 / 72, 'pc': 16, 'mm': 96 / 25.4, 'cm': 96 / 2.54, 'in': 96}
+# the preview that finds the extent of a layer is this many times smaller
+PREVIEW = 4
+
+def length(value):
+    """An absolute SVG length in CSS pixels, or None"""
+    match = re.fullmatch(r'\s*([-+\d.eE]+)\s*([a-z]*)\s*', value or '')
+    if not match or match.group(2) not in UNITS:
+        return None
+    return float(match.group(1)) * UNITS[match.group(2)]
+
+def page_size(root):
+    """Width and height of the page in CSS pixels, or None if it is not fixed"""
+    viewbox = [float(v) for v in re.split(r'[\s,]+', root.get('viewBox', '').strip()) if v]
+    width, height = length(root.get('width')), length(root.get('height'))
+    if len(viewbox) == 4:
+        width = width if width is not None else viewbox[2]
+        height = height if height is not None else viewbox[3]
+    if width is None or height is None:
+        return None
+    return width, height
+
+def crop(document, page, dpi, base_url):
+    """Pixel box (left, top, right, bottom) of the drawn part of a layer, or None
+
+    Found on a small preview, with a margin of one preview pixel for content
+    that only covers part of a pixel.
+    """
+    import cairosvg
+    scale = dpi / 96.0
+    full = (int(page[0] * scale), int(page[1] * scale))
+    preview = cairosvg.svg2png(bytestring=document, url=base_url, scale=scale / PREVIEW)
+    with Image.open(io.BytesIO(preview)) as image:
+        bbox = image.getchannel('A').getbbox()
+    if bbox is None:
+        return None
+    return (
+        max(0, (bbox[0] - 1) * PREVIEW),
+        max(0, (bbox[1] - 1) * PREVIEW),
+        min(full[0], (bbox[2] + 1) * PREVIEW),
+        min(full[1], (bbox[3] + 1) * PREVIEW),
+    )
+
+def page_sized(document, page):
+    """SVG bytes with the root's width and height set to the page size in px
+
+    A nested <svg> without an absolute size fills its parent's viewport,
+    which would squeeze the page into a cropped view.
+    """
+    body = document.split(b'?>', 1)[1] if document.startswith(b'<?xml') else document
+    match = re.search(rb'<(?:[\w.-]+:)?svg\b[^>]*>', body)
+    tag = re.sub(rb'\s(?:width|height)\s*=\s*(?:"[^"]*"|\'[^\']*\')', b'', match.group(0))
+    end = -2 if tag.endswith(b'/>') else -1
+    tag = tag[:end] + f' width="{page[0]}px" height="{page[1]}px"'.encode() + tag[end:]
+    return body[:match.start()] + tag + body[match.end():]
+
+def rasterize(document, output_path, dpi, base_url, page=None):
+    """Render SVG bytes to a PNG file; relative references resolve against base_url
+
+    With the page size (in CSS pixels), only the part of the page the layer
+    draws on is rasterized; its offset on the page is part of the returned
+    manifest entry.
+    """
+    import cairosvg
+    scale = dpi / 96.0
+    if page is None:
+        cairosvg.svg2png(
+            bytestring=document,
+            url=base_url,
+            write_to=str(output_path),
+            scale=scale
+        )
+        return layer_entry(output_path)
+
+    full = (int(page[0] * scale), int(page[1] * scale))
+    box = crop(document, page, dpi, base_url)
+    if box is None:
+        Image.new('RGBA', (1, 1)).save(output_path)
+        return layer_entry(output_path, page=full)
+    left, top, right, bottom = box
+    # the layer's document, nested in one whose view is the cropped box
+    body = page_sized(document, page)
+    x, y, width, height = left / scale, top / scale, (right - left) / scale, (bottom - top) / scale
+    wrapper = (
+        f'<svg xmlns="{SVG}" width="{width}" height="{height}" '
+        f'viewBox="{x} {y} {width} {height}">'
+    ).encode() + body + b'</svg>'
+    cairosvg.svg2png(
+        bytestring=wrapper,
+        url=base_url,
+        write_to=str(output_path),
+        output_width=right - left,
+        output_height=bottom - top
+    )
+    return layer_entry(output_path, offset=(left, top), page=full)
+
+def process_svg(input_file, output_dir, output_format='svg', dpi=300, workers=None, delta=False,
+                full_page=False, backend='etree'):
+    """Process SVG and split layers
+
+    PNG layers are rasterized in parallel, in a pool of worker processes, and
+    listed in <stem>.layers.json along with their bounding boxes and hashes.
+    With delta, each layer is also stored as the pixels it adds to the layers
+    below it (see deltas.py). Unless full_page is set, each PNG only covers
+    the part of the page its layer draws on. The lxml backend streams the
+    file instead of loading it whole (see stream_layer_documents). Returns
+    the files written.
+    """
     os.makedirs(output_dir, exist_ok=True)
     
     # Register namespaces
-    ET.register_namespace('', "http://www.w3.org/2000/svg")
-    ET.register_namespace('sodipodi', "http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd")
-    ET.register_namespace('inkscape', "http://www.inkscape.org/namespaces/inkscape")
+    ET.register_namespace('', SVG)
+    ET.register_namespace('sodipodi', SODIPODI)
+    ET.register_namespace('inkscape', INKSCAPE)
     
     # Parse the SVG file
-    tree = ET.parse(input_file)
-    root = tree.getroot()
-    
-    # Define namespace dictionary
-    ns = {'svg': 'http://www.w3.org/2000/svg',
-          'inkscape': 'http://www.inkscape.org/namespaces/inkscape'}
-    
-    # Find all layers
-    layers = root.findall(".//*[@inkscape:groupmode='layer']", ns)
+    if backend == 'lxml':
+        root, documents = stream_layer_documents(input_file)
+    else:
+        root = ET.parse(input_file).getroot()
+        documents = layer_documents(root)
+    first = next(documents, None)
     
-    if not layers:
+    if first is None:
         print("No layers found - processing entire SVG")
         output_path = Path(output_dir) / f"{Path(input_file).stem}.{output_format}"
         if output_format.lower() == 'png':
             # Convert entire SVG to PNG
+            import cairosvg
             cairosvg.svg2png(
                 url=input_file,
                 write_to=str(output_path),
@@ -59,71 +284,61 @@ def process_svg(input_file, output_dir, output_format='svg', dpi=300):
             )
         else:
             # Copy SVG as-is
-            tree.write(output_path, encoding='unicode', xml_declaration=True)
-        return
+            shutil.copyfile(input_file, output_path)
+        return [output_path]
+    documents = itertools.chain([first], documents)
 
     # Process each layer
-    for layer in layers:
-        # Get layer label
-        label = layer.get(f'{{{ns["inkscape"]}}}label', '')
-        safe_label = re.sub(r'[^a-zA-Z0-9_-]', '_', label or f'layer_{layers.index(layer)}')
-        
-        # Create new SVG for this layer
-        new_root = ET.Element('svg')
-        # Copy SVG attributes
-        for attr, value in root.attrib.items():
-            new_root.set(attr, value)
-        
-        # Copy any defs section
-        defs = root.find('svg:defs', ns)
-        if defs is not None:
-            new_root.append(ET.fromstring(ET.tostring(defs)))
+    base_url = str(Path(input_file).resolve())
+    page = None if full_page else page_size(root)
+    outputs = []
+    layers = []
+    # each document holds a copy of the tree, so only a few are in flight
+    in_flight = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = []
         
-        # First hide all layers in the new SVG
-        for other_layer in root.findall(".//*[@inkscape:groupmode='layer']", ns):
-            layer_copy = ET.fromstring(ET.tostring(other_layer))
-            style = layer_copy.get('style', '')
-            style = re.sub(r'display:\s*[^;]+;?', '', style)
-            style = (style + ';display:none').lstrip(';')
-            layer_copy.set('style', style)
-            new_root.append(layer_copy)
+        def collect():
+            label, future = futures.pop(0)
+            layers.append(dict(label=label, **future.result()))
+            print(f"Processed layer: {label}")
         
-        # Show only the current layer
-        current_layer = new_root.findall(".//*[@inkscape:groupmode='layer']", ns)[layers.index(layer)]
-        show_layer(current_layer)
-        
-        # Create output filename
-        output_path = Path(output_dir) / f"{Path(input_file).stem}_{safe_label}.{output_format}"
-        
-        if output_format.lower() == 'png':
-            # Save temporary SVG
-            temp_svg = output_path.with_suffix('.svg')
-            ET.ElementTree(new_root).write(temp_svg, encoding='unicode', xml_declaration=True)
+        for label, document in documents:
+            safe_label = re.sub(r'[^a-zA-Z0-9_-]', '_', label)
             
-            # Convert to PNG
-            cairosvg.svg2png(
-                url=str(temp_svg),
-                write_to=str(output_path),
-                scale=dpi/96.0
-            )
+            # Create output filename
+            output_path = Path(output_dir) / f"{Path(input_file).stem}_{safe_label}.{output_format}"
+            outputs.append(output_path)
             
-            # Remove temporary SVG
-            os.remove(temp_svg)
-        else:
-            # Save as SVG
-            ET.ElementTree(new_root).write(output_path, encoding='unicode', xml_declaration=True)
+            if output_format.lower() == 'png':
+                if len(futures) >= in_flight:
+                    collect()
+                futures.append((label, executor.submit(rasterize, document, output_path, dpi, base_url, page)))
+            else:
+                # Save as SVG
+                output_path.write_bytes(document)
+                print(f"Processed layer: {label}")
         
-        print(f"Processed layer: {label}")
+        while futures:
+            collect()
+    
+    if layers:
+        stem = Path(input_file).stem
+        write_manifest(manifest_path(output_dir, stem), input_file, layers)
+        outputs.append(manifest_path(output_dir, stem))
+        if delta:
+            deltas.encode([Path(output_dir) / layer['file'] for layer in layers], output_dir, stem)
+    return outputs
 
 def main():
     parser = argparse.ArgumentParser(
         description='Split Inkscape SVG layers into separate files.'
     )
-    parser.add_argument('input_file', help='Input SVG file to process')
+    parser.add_argument('input_file', help='Input SVG file, or directory of SVG files, to process')
     parser.add_argument(
         '-o', '--output-dir',
-        default='output',
-        help='Output directory for split files (default: output)'
+        default=None,
+        help='Output directory for split files (default: output, or next to each file of a directory)'
     )
     parser.add_argument(
         '-f', '--format',
@@ -137,6 +352,38 @@ def main():
         default=300,
         help='DPI for PNG output (default: 300)'
     )
+    parser.add_argument(
+        '-j', '--workers',
+        type=int,
+        default=None,
+        help='Number of processes that rasterize layers (default: all cores)'
+    )
+    parser.add_argument(
+        '--full-page',
+        action='store_true',
+        help='Rasterize every PNG layer over the whole page instead of cropping it'
+    )
+    parser.add_argument(
+        '--delta',
+        action='store_true',
+        help='Also store each PNG layer as the pixels it adds to the layers below'
+    )
+    parser.add_argument(
+        '--backend',
+        choices=['etree', 'lxml'],
+        default='etree',
+        help='XML parser; lxml streams very large files (default: etree)'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='In a directory, also split files that did not change since their last split'
+    )
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Keep running, and split files again whenever they are saved'
+    )
     
     args = parser.parse_args()
     
@@ -144,8 +391,23 @@ def main():
         print(f"Error: Input file '{args.input_file}' does not exist")
         return 1
     
+    if os.path.isdir(args.input_file) or args.watch:
+        # every layered SVG in the directory that changed since its last split
+        output_dir = args.output_dir or (None if os.path.isdir(args.input_file) else 'output')
+        def split(path, workers):
+            return process_svg(str(path), output_dir or path.parent, args.format, args.dpi,
+                               workers, args.delta, args.full_page, args.backend)
+        options = [output_dir, args.format, args.dpi, args.delta, args.full_page, args.backend]
+        splitter = Splitter('svg_splitter', ['svg_splitter.py', 'layer_manifest.py', 'deltas.py'],
+                            LAYERED, split, options)
+        failed = split_all([args.input_file], splitter, args.workers, args.force)
+        if args.watch:
+            watch([args.input_file], splitter, args.workers)
+        return 1 if failed else 0
+    
     try:
-        process_svg(args.input_file, args.output_dir, args.format, args.dpi)
+        process_svg(args.input_file, args.output_dir or 'output', args.format, args.dpi, args.workers,
+                    args.delta, args.full_page, args.backend)
         return 0
     except Exception as e:
         print(f"Error processing file: {e}")
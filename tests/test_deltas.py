@@ -0,0 +1,89 @@
+import json
+
+import numpy as np
+from PIL import Image
+
+import deltas
+
+
+def layer(shape, box, color):
+    """Transparent RGBA page with an opaque or translucent rectangle"""
+    pixels = np.zeros(shape + (4,), dtype=np.uint8)
+    left, top, right, bottom = box
+    pixels[top:bottom, left:right] = color
+    return pixels
+
+
+def save(pixels, path):
+    Image.fromarray(pixels, 'RGBA').save(path)
+    return path
+
+
+def test_composite_is_straight_alpha_over():
+    below = layer((4, 4), (0, 0, 4, 4), (0, 0, 255, 255))
+    opaque = layer((4, 4), (0, 0, 2, 2), (255, 0, 0, 255))
+    result = deltas.composite(below, opaque)
+    assert (result[:2, :2] == (255, 0, 0, 255)).all()
+    assert (result[2:, 2:] == below[2:, 2:]).all()
+
+    half = layer((4, 4), (0, 0, 4, 4), (255, 255, 255, 128))
+    result = deltas.composite(np.zeros_like(half), half)
+    # over nothing, a translucent layer keeps its own colour and alpha
+    assert (result == half).all()
+
+
+def test_composite_only_inside_bbox():
+    below = np.zeros((4, 4, 4), dtype=np.uint8)
+    full = layer((4, 4), (0, 0, 4, 4), (255, 0, 0, 255))
+    result = deltas.composite(below, full, bbox=(1, 1, 3, 3))
+    assert (result[1:3, 1:3] == (255, 0, 0, 255)).all()
+    assert result[0].sum() == 0 and result[3].sum() == 0
+
+
+def test_apply_replaces_changed_pixels_only():
+    below = layer((4, 6), (0, 0, 6, 4), (0, 0, 255, 255))
+    delta = np.zeros((2, 2, 4), dtype=np.uint8)
+    delta[0, 0] = (255, 0, 0, 255)
+    result = deltas.apply(below, delta, (3, 1))
+    assert tuple(result[1, 3]) == (255, 0, 0, 255)
+    changed = np.any(result != below, axis=-1)
+    assert changed.sum() == 1
+
+
+def test_encode_then_apply_reproduces_composites(tmp_path):
+    layers = [
+        layer((12, 16), (0, 0, 16, 12), (255, 255, 255, 255)),
+        layer((12, 16), (2, 3, 7, 9), (255, 0, 0, 255)),
+        layer((12, 16), (5, 5, 14, 10), (0, 128, 0, 100)),
+        # draws nothing
+        np.zeros((12, 16, 4), dtype=np.uint8),
+    ]
+    paths = [save(pixels, tmp_path / f'figure_Layer_{i + 1}.png') for i, pixels in enumerate(layers)]
+    entries = deltas.encode(paths, tmp_path, 'figure')
+    assert json.loads(deltas.manifest_path(tmp_path, 'figure').read_text())['layers'] == entries
+    assert entries[0]['previous'] is None
+    assert entries[1]['previous'] == entries[0]['source']
+    assert entries[3]['file'] is None
+
+    expected = np.zeros_like(layers[0])
+    shown = np.zeros_like(layers[0])
+    for pixels, entry in zip(layers, entries):
+        expected = deltas.composite(expected, pixels)
+        if entry['file'] is not None:
+            with Image.open(tmp_path / entry['file']) as image:
+                delta = np.asarray(image.convert('RGBA'))
+            shown = deltas.apply(shown, delta, entry['offset'])
+        assert (shown == expected).all()
+    # deltas are cropped to the pixels that change
+    assert entries[1]['offset'] == [2, 3]
+    with Image.open(tmp_path / entries[1]['file']) as image:
+        assert image.size == (5, 6)
+
+
+def test_composite_at_clips_to_the_page():
+    below = np.zeros((4, 4, 4), dtype=np.uint8)
+    crop = layer((3, 3), (0, 0, 3, 3), (255, 0, 0, 255))
+    result = deltas.composite_at(below, crop, (2, 1))
+    expected = layer((4, 4), (2, 1, 4, 4), (255, 0, 0, 255))
+    assert (result == expected).all()
+    assert below.sum() == 0
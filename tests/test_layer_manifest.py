@@ -0,0 +1,75 @@
+import numpy as np
+from PIL import Image
+
+import deltas
+from layer_manifest import layer_entry, manifest_path, placement, read_entries, write_manifest
+
+
+def page():
+    """A 20x10 page with a translucent rectangle at (6, 2)-(15, 7)"""
+    pixels = np.zeros((10, 20, 4), dtype=np.uint8)
+    pixels[2:7, 6:15] = (0, 0, 255, 200)
+    return pixels
+
+
+def test_layer_entry_places_bbox_on_the_page(tmp_path):
+    full = tmp_path / 'full.png'
+    Image.fromarray(page(), 'RGBA').save(full)
+    entry = layer_entry(full)
+    assert entry['size'] == entry['page'] == [20, 10]
+    assert entry['offset'] == [0, 0]
+    assert entry['bbox'] == [6, 2, 15, 7]
+
+    cropped = tmp_path / 'cropped.png'
+    Image.fromarray(page()[1:8, 4:16], 'RGBA').save(cropped)
+    entry = layer_entry(cropped, offset=(4, 1), page=(20, 10))
+    assert entry['size'] == [12, 7]
+    assert entry['bbox'] == [6, 2, 15, 7]
+
+
+def test_empty_layer_has_no_bbox(tmp_path):
+    path = tmp_path / 'empty.png'
+    Image.new('RGBA', (3, 3)).save(path)
+    assert layer_entry(path)['bbox'] is None
+
+
+def test_read_entries_by_resolved_file(tmp_path):
+    path = tmp_path / 'figure_1.png'
+    Image.fromarray(page(), 'RGBA').save(path)
+    write_manifest(manifest_path(tmp_path, 'figure'), 'figure.svg', [dict(label='a', **layer_entry(path))])
+    (tmp_path / 'broken.layers.json').write_text('{')
+    entries = read_entries(tmp_path)
+    assert list(entries) == [path.resolve()]
+    assert entries[path.resolve()]['label'] == 'a'
+
+
+def test_placement():
+    assert placement(None, (5, 4)) == ((5, 4), (0, 0))
+    # entries from before layers were cropped cover the whole page
+    assert placement({'file': 'a.png'}, (5, 4)) == ((5, 4), (0, 0))
+    assert placement({'page': [20, 10], 'offset': [4, 1]}, (12, 7)) == ((20, 10), (4, 1))
+
+
+def test_cropped_layer_matches_full_page(tmp_path):
+    full, cropped = tmp_path / 'full' / 'figure_1.png', tmp_path / 'cropped' / 'figure_1.png'
+    for path in (full, cropped):
+        path.parent.mkdir()
+    Image.fromarray(page(), 'RGBA').save(full)
+    Image.fromarray(page()[1:8, 4:16], 'RGBA').save(cropped)
+    write_manifest(
+        manifest_path(cropped.parent, 'figure'), 'figure.svg',
+        [layer_entry(cropped, offset=(4, 1), page=(20, 10))],
+    )
+
+    loaded = deltas.load_layer(cropped, read_entries(cropped.parent))
+    assert (loaded == page()).all()
+
+    below = np.full((10, 20, 4), 255, dtype=np.uint8)
+    below[:, 10:] = (0, 255, 0, 128)
+    entry = read_entries(cropped.parent)[cropped.resolve()]
+    _, offset = placement(entry, entry['size'])
+    with Image.open(cropped) as image:
+        crop = np.asarray(image.convert('RGBA'))
+    assert (deltas.composite_at(below, crop, offset) == deltas.composite(below, page())).all()
+
+    assert deltas.encode([full], full.parent, 'figure') == deltas.encode([cropped], cropped.parent, 'figure')
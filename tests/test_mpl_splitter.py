@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+import mpl_splitter
+
+
+def test_key_white_hard():
+    pixels = np.array([[[255, 255, 255, 255], [250, 252, 255, 255], [0, 0, 0, 255]]], dtype=np.uint8)
+    keyed = mpl_splitter.key_white(pixels)
+    assert keyed[0, 0, 3] == 0
+    assert (keyed[0, 1:] == pixels[0, 1:]).all()
+
+    keyed = mpl_splitter.key_white(pixels, tolerance=5)
+    assert list(keyed[:, :, 3].ravel()) == [0, 0, 255]
+
+
+def test_key_white_soft_blends_back_onto_white():
+    gray = np.array([[[128, 128, 128, 255], [255, 255, 255, 255]]], dtype=np.uint8)
+    keyed = mpl_splitter.key_white(gray, soft=True)
+    # anti-aliased grey becomes partially transparent black
+    assert tuple(keyed[0, 0, :3]) == (0, 0, 0)
+    assert keyed[0, 0, 3] == 127
+    assert keyed[0, 1, 3] == 0
+    alpha = keyed[..., 3:] / 255
+    blended = keyed[..., :3] * alpha + 255 * (1 - alpha)
+    assert np.abs(blended - gray[..., :3]).max() <= 1
+
+
+def test_key_white_stacked_images():
+    images = np.full((3, 2, 2, 4), 255, dtype=np.uint8)
+    images[1, 0, 0] = (10, 20, 30, 255)
+    keyed = mpl_splitter.key_white(images)
+    assert keyed.shape == images.shape
+    assert keyed[..., 3].sum() == 255
+
+
+def test_parse_selection():
+    assert mpl_splitter.parse_selection(None) is None
+    assert mpl_splitter.parse_selection('') is None
+    assert mpl_splitter.parse_selection('data_1, data_2 + data_3,,line2d_*') == [
+        ['data_1'], ['data_2', 'data_3'], ['line2d_*'],
+    ]
+
+
+def test_layer_visibility():
+    # figure(0) > axes(1) > [patch(2), line(3) > marker(4), text(5)]; colorbar(6)
+    parents = [None, 0, 1, 1, 3, 1, 0]
+    background, lines, colorbar = mpl_splitter.layer_visibility(parents, [[3], [6, 5]])
+    assert background == [True, True, True, False, False, False, False]
+    # a layer shows its artists, their children and their parents only
+    assert lines == [True, True, False, True, True, False, False]
+    assert colorbar == [True, True, False, False, False, True, True]
+
+
+def test_layer_visibility_listed_artist_leaves_its_parent():
+    # like split_svg_layers, an artist listed itself goes to its own group,
+    # also when its parent is in an earlier one
+    parents = [None, 0, 1]
+    _, first, second = mpl_splitter.layer_visibility(parents, [[1], [2]])
+    assert first == [True, True, False]
+    assert second == [True, True, True]
+
+
+def test_export_layers(tmp_path):
+    pytest.importorskip('matplotlib')
+    from matplotlib.figure import Figure
+    from matplotlib.patches import Rectangle
+    from PIL import Image
+
+    figure = Figure(figsize=(2, 1), dpi=50)
+    ax = figure.add_axes((0, 0, 1, 1))
+    ax.set_xlim(0, 2)
+    ax.set_ylim(0, 1)
+    ax.set_axis_off()
+    left = ax.add_patch(Rectangle((0.1, 0.1), 0.8, 0.8, color='red'))
+    right = ax.add_patch(Rectangle((1.1, 0.1), 0.8, 0.8, color='blue'))
+    paths = mpl_splitter.export_layers(
+        figure, {'left': left, 'right': [right]}, tmp_path / 'figure', dpi=50, workers=2,
+    )
+    assert [path.name for path in paths] == [
+        'figure_1.png', 'figure_2.png', 'figure_3.png', 'figure.layers.json',
+    ]
+
+    alphas = []
+    for path in paths[:3]:
+        with Image.open(path) as image:
+            alphas.append(np.asarray(image.convert('RGBA'))[..., 3])
+    assert len({alpha.shape for alpha in alphas}) == 1
+    background, shown_left, shown_right = alphas
+    half = background.shape[1] // 2
+    # the figure and axes backgrounds are transparent, and each layer hides
+    # the other rectangle entirely
+    assert background.max() == 0
+    assert shown_left[:, :half].max() == 255 and shown_left[:, half:].max() == 0
+    assert shown_right[:, half:].max() == 255 and shown_right[:, :half].max() == 0
@@ -0,0 +1,70 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import svg_splitter
+
+NESTED = '''<svg xmlns="http://www.w3.org/2000/svg"
+     xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape" width="10" height="10">
+  <defs><linearGradient id="gradient"/></defs>
+  <g inkscape:groupmode="layer" inkscape:label="Back" style="opacity:0.5">
+    <rect width="1" height="1"/>
+    <g inkscape:groupmode="layer" inkscape:label="Inner">
+      <circle r="1"/>
+      <g inkscape:groupmode="layer"><circle r="2"/></g>
+    </g>
+    <rect width="2" height="2"/>
+  </g>
+  <g id="loose"><g inkscape:groupmode="layer" inkscape:label="Loose"/></g>
+  <g inkscape:groupmode="layer" inkscape:label="Front" style="display:none"><path d="M0 0"/></g>
+</svg>
+'''
+GROUPMODE = f'{{{svg_splitter.INKSCAPE}}}groupmode'
+LABEL = f'{{{svg_splitter.INKSCAPE}}}label'
+
+
+def shown_layers(document):
+    """Labels of the layers a layer document draws"""
+    root = ET.fromstring(document)
+    parents = {child: parent for parent in root.iter() for child in parent}
+
+    def shown(elem):
+        while elem is not root:
+            if elem.get('style', '').endswith('display:none'):
+                return False
+            elem = parents[elem]
+        return True
+
+    return [
+        elem.get(LABEL) for elem in root.iter()
+        if elem.get(GROUPMODE) == 'layer' and shown(elem)
+    ]
+
+
+def test_backends_agree_on_nested_layers(tmp_path):
+    pytest.importorskip('lxml')
+    path = tmp_path / 'nested.svg'
+    path.write_text(NESTED)
+    tree = list(svg_splitter.layer_documents(ET.parse(path).getroot()))
+    _, streamed = svg_splitter.stream_layer_documents(path)
+    streamed = list(streamed)
+
+    assert [label for label, _ in tree] == ['Back', 'Inner', 'layer_2', 'Loose', 'Front']
+    assert [label for label, _ in streamed] == [label for label, _ in tree]
+    for (_, expected), (_, document) in zip(tree, streamed):
+        assert shown_layers(document) == shown_layers(expected)
+    assert shown_layers(streamed[2][1]) == ['Back', 'Inner', None]
+    assert shown_layers(streamed[3][1]) == []
+
+
+@pytest.mark.parametrize('size', ['', 'width="100%" height="100%"', "width='10mm' height='5mm'"])
+def test_page_sized_fixes_the_nested_page(size):
+    document = (
+        f'<?xml version="1.0"?>\n<svg xmlns="http://www.w3.org/2000/svg" {size} '
+        f'viewBox="0 0 40 20" stroke-width="2"><rect width="4" height="4"/></svg>'
+    ).encode()
+    root = ET.fromstring(svg_splitter.page_sized(document, (40.0, 20.0)))
+    assert (root.get('width'), root.get('height')) == ('40.0px', '20.0px')
+    assert root.get('viewBox') == '0 0 40 20' and root.get('stroke-width') == '2'
+    assert svg_splitter.page_size(root) == (40.0, 20.0)
+    assert root[0].get('width') == '4'
@@ -0,0 +1,115 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+import manim
+from manim import ManimColor
+
+
+# set TEXT_CACHE_DIR to an empty string to disable the on-disk layer
+CACHE_DIR = os.environ.get('TEXT_CACHE_DIR', 'media/text_cache')
+CACHE_SIZE = 1024
+
+
+def freeze(value):
+    """Hashable representation of (nested) constructor arguments"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, ManimColor):
+        return ('color', value.to_hex(with_alpha=True))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, np.ndarray):
+        return ('array', value.dtype.str, value.shape, value.tobytes())
+    if isinstance(value, manim.TexTemplate):
+        return ('template', value.tex_compiler, value.output_format, value.body)
+    raise TypeError(f'cannot use {type(value)} as part of a cache key')
+
+
+class MobjectCache:
+    """Memoizes a mobject constructor and hands out copies of prebuilt mobjects
+
+    Copies are cheap compared to building text, which goes through Pango (or
+    LaTeX) and SVG path parsing every time. Prebuilt mobjects are kept in an
+    in-process LRU and, if a cache directory is set, pickled to disk so they
+    survive across renders.
+    """
+
+    def __init__(self, factory, maxsize: int = CACHE_SIZE, directory: str = CACHE_DIR):
+        self.factory = factory
+        self.maxsize = maxsize
+        self.directory = Path(directory) if directory else None
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def disk_path(self, key) -> Path:
+        digest = hashlib.sha256(repr((manim.__version__, key)).encode()).hexdigest()
+        return self.directory / f'{self.factory.__name__}_{digest}.pickle'
+
+    def load(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with open(self.disk_path(key), 'rb') as f:
+                return pickle.load(f)
+        except Exception:  # missing, truncated or stale entries are rebuilt
+            return None
+
+    def dump(self, key, mobject):
+        if self.directory is None:
+            return
+        path = self.disk_path(key)
+        temporary = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # write atomically, parallel renders may share the directory
+            with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as f:
+                temporary = f.name
+                pickle.dump(mobject, f)
+            os.replace(temporary, path)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            if temporary is not None and os.path.exists(temporary):
+                os.remove(temporary)
+
+    def build(self, key, args, kwargs, scale=None):
+        mobject = self.load(key)
+        if mobject is None:
+            self.misses += 1
+            mobject = self.factory(*args, **kwargs)
+            if scale is not None:
+                mobject.scale(scale)
+            self.dump(key, mobject)
+        else:
+            self.hits += 1
+        return mobject
+
+    def __call__(self, *args, scale=None, **kwargs):
+        try:
+            key = freeze((args, kwargs, scale))
+        except TypeError:
+            mobject = self.factory(*args, **kwargs)
+            return mobject.scale(scale) if scale is not None else mobject
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        else:
+            self.entries[key] = self.build(key, args, kwargs, scale)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return self.entries[key].copy()
+
+
+# drop-in replacements for manim's Text, Tex and MathTex; constructor arguments
+# (and an optional scale applied before caching) form the key
+Text = MobjectCache(manim.Text)
+Tex = MobjectCache(manim.Tex)
+MathTex = MobjectCache(manim.MathTex)
+
@@ -0,0 +1,127 @@
+import copy
+
+import cv2
+import numpy as np
+
+from manim import ImageMobject
+
+from parse_movie import open_tensor, read_holds
+
+# forward jumps by more frames than this seek rather than decode each frame
+SEEK_FRAMES = 16
+
+
+class VideoReader:
+    """Decodes the frames of a video file on demand, keeping only the last one"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.capture = cv2.VideoCapture(self.path)
+        if not self.capture.isOpened():
+            raise ValueError(f'could not open video file {self.path}')
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS)
+        self.frame_count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.index = -1
+        self.frame = None
+
+    def __len__(self):
+        return self.frame_count
+
+    def read(self, index: int) -> np.ndarray:
+        """RGB frame at index; sequential access only decodes each frame once"""
+        index = min(max(index, 0), len(self) - 1)
+        if index == self.index:
+            return self.frame
+        if index < self.index or index - self.index > SEEK_FRAMES:
+            # jump instead of decoding every frame in between; the decoder
+            # may land before index, and the remaining frames are skipped
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+            self.index = min(int(self.capture.get(cv2.CAP_PROP_POS_FRAMES)), index) - 1
+        # skipped frames are demuxed but not converted
+        while self.index < index - 1 and self.capture.grab():
+            self.index += 1
+        success, frame = self.capture.read()
+        if success:
+            self.index = index
+            self.frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return self.frame
+
+    def release(self):
+        self.capture.release()
+
+
+class TensorReader:
+    """Frames of a frame tensor file written by parse_movie.py, sliced from a memory map"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.frames, self.fps = open_tensor(self.path)
+        # de-duplicated frames are held for several source frames
+        holds = read_holds(self.path + '.json') or [1] * len(self.frames)
+        self.ends = np.cumsum(holds)
+
+    def __len__(self):
+        """Number of source frames, i.e. including the dropped duplicates"""
+        return int(self.ends[-1]) if len(self.ends) else 0
+
+    def read(self, index: int) -> np.ndarray:
+        index = min(max(index, 0), len(self) - 1)
+        return self.frames[np.searchsorted(self.ends, index, side='right')]
+
+    def release(self):
+        pass
+
+
+def open_video(path):
+    """Frame reader for a video file or a frame tensor (.frames) file"""
+    if str(path).endswith('.frames'):
+        return TensorReader(path)
+    return VideoReader(path)
+
+
+class VideoMobject(ImageMobject):
+    """Image mobject which shows a video, decoded frame by frame during playback
+
+    path is either a video file or a frame tensor written by parse_movie.py.
+    Source frames are resampled to the render frame rate: every rendered frame
+    shows the source frame at the current playback time. fps overrides the
+    playback rate of the source frames, e.g. to slow a movie down.
+    """
+
+    def __init__(self, path, fps: float = None, **kwargs):
+        self.reader = open_video(path)
+        self.fps = fps or self.reader.fps
+        self.time = 0.0
+        super().__init__(self.reader.read(0), **kwargs)
+
+    def __deepcopy__(self, memo):
+        # the decoder cannot be copied, so copies share it
+        memo[id(self.reader)] = self.reader
+        result = self.__class__.__new__(self.__class__)
+        memo[id(self)] = result
+        for key, value in self.__dict__.items():
+            setattr(result, key, copy.deepcopy(value, memo))
+        return result
+
+    @property
+    def duration(self) -> float:
+        return len(self.reader) / self.fps
+
+    def seek(self, time: float):
+        self.time = time
+        frame = self.reader.read(int(time * self.fps))
+        # keep the current alpha channel such that fades still apply
+        self.pixel_array = np.dstack([frame, self.pixel_array[:, :, 3]])
+        return self
+
+    def advance(self, dt: float):
+        return self.seek(self.time + dt)
+
+    def start(self):
+        """Advance through the video along with the scene time"""
+        self.add_updater(VideoMobject.advance)
+        return self
+
+    def stop(self):
+        self.remove_updater(VideoMobject.advance)
+        return self